@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+import timeit
+from unittest import TestCase
+
+import motorengine
+from bson import BSON
+from bson.codec_options import CodecOptions
+
+from motorengine.values import DecodedSon
+
+
+class MotorAddress(motorengine.Document):
+    street = motorengine.StringField()
+    number = motorengine.IntField()
+
+
+class MotorDocument(motorengine.Document):
+    __collection__ = "MotorBenchmarkDecode"
+    field1 = motorengine.StringField()
+    field2 = motorengine.IntField()
+    field3 = motorengine.DateTimeField(default=datetime.now)
+    address = motorengine.EmbeddedDocumentField(MotorAddress)
+    history = motorengine.ListField(motorengine.EmbeddedDocumentField(MotorAddress))
+
+
+class DecodedMotorDocument(MotorDocument):
+    __decode_values__ = True
+
+
+def get_reply(documents):
+    # documents are read from the reply of a find command, where they are subdocuments
+    return BSON.encode({
+        "cursor": {"firstBatch": documents, "id": 0, "ns": "test.MotorBenchmarkDecode"},
+        "ok": 1.0
+    })
+
+
+def load(reply, document_class, codec_options):
+    result = BSON(reply).decode(codec_options)
+    return [document_class.from_son(son) for son in result["cursor"]["firstBatch"]]
+
+
+class TestDecodeValues(TestCase):
+    def benchmark(self, name, documents):
+        iterations = 20
+        reply = get_reply(documents)
+
+        dict_time = min(timeit.repeat(
+            lambda: load(reply, MotorDocument, CodecOptions()),
+            number=iterations, repeat=5
+        ))
+
+        decoded_time = min(timeit.repeat(
+            lambda: load(reply, DecodedMotorDocument, CodecOptions(document_class=DecodedSon)),
+            number=iterations, repeat=5
+        ))
+
+        print
+        print
+        print("[%s] %d documents loaded from dicts in %.2fms" % (name, len(documents), dict_time * 1000 / iterations))
+        print("[%s] %d documents loaded from decoded values in %.2fms" % (name, len(documents), decoded_time * 1000 / iterations))
+        print
+        print
+
+    def test_decode_flat_documents(self):
+        self.benchmark("Flat", [
+            {"_id": index, "field1": "whatever", "field2": index, "field3": datetime(2014, 1, 1)}
+            for index in range(1000)
+        ])
+
+    def test_decode_documents_with_subdocuments(self):
+        self.benchmark("Subdocuments", [
+            {
+                "_id": index, "field1": "whatever", "field2": index, "field3": datetime(2014, 1, 1),
+                "address": {"street": "Infinite Loop", "number": 1},
+                "history": [{"street": "Street %d" % number, "number": number} for number in range(5)],
+            }
+            for index in range(1000)
+        ])
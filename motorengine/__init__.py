@@ -7,7 +7,10 @@ try:
     from pymongo import ASCENDING, DESCENDING  # NOQA
 
     from motorengine.connection import connect, disconnect  # NOQA
-    from motorengine.document import Document  # NOQA
+    from motorengine.document import Document, EmbeddedDocument  # NOQA
+    from motorengine.indexes import sync_indexes  # NOQA
+    from motorengine.buffer import flush_write_buffers  # NOQA
+    from motorengine.session import Session  # NOQA
 
     from motorengine.fields import (  # NOQA
         BaseField, StringField, BooleanField, DateTimeField,
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+from tornado.concurrent import Future, return_future
+from tornado.ioloop import IOLoop
+from tornado.stack_context import NullContext
+
+from motorengine.connection import DEFAULT_CONNECTION_NAME
+from motorengine.errors import WriteBufferFullError, WriteBufferClosedError
+from motorengine.indexes import index_registry
+
+DEFAULT_WRITE_BUFFER_BATCH_SIZE = 100
+DEFAULT_WRITE_BUFFER_DELAY = 0.01
+DEFAULT_WRITE_BUFFER_MAX_SIZE = 10000
+
+
+class WriteBuffer(object):
+    '''
+    Collects the inserts of new documents of a document class issued within `delay`
+    seconds of each other (or until `batch_size` documents are waiting) and sends them
+    in a single unordered `insert_many`. Each insert resolves (or fails) on its own.
+
+    At most `max_size` documents can be waiting or being inserted at the same time;
+    inserts beyond that fail right away with a `WriteBufferFullError`.
+    '''
+
+    def __init__(self, queryset, alias=None, batch_size=DEFAULT_WRITE_BUFFER_BATCH_SIZE,
+                 delay=DEFAULT_WRITE_BUFFER_DELAY, max_size=DEFAULT_WRITE_BUFFER_MAX_SIZE):
+        self.queryset = queryset
+        self.alias = alias
+        self.batch_size = batch_size
+        self.delay = delay
+        self.max_size = max_size
+
+        self.pending = []
+        self.in_flight = 0
+        self.timeout = None
+        self.io_loop = None
+
+    def __len__(self):
+        return len(self.pending) + self.in_flight
+
+    def insert(self, son):
+        '''
+        Queues the SON of a document to be inserted. Returns a future that resolves
+        to the `_id` of the inserted document.
+        '''
+        future = Future()
+
+        if len(self) >= self.max_size:
+            future.set_exception(WriteBufferFullError(
+                "The write buffer of '%s' is full (%d documents)." % (self.queryset.__klass__.__name__, self.max_size)
+            ))
+            return future
+
+        self.pending.append((son, future))
+
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif self.timeout is None:
+            # the buffer is shared by all callers, so it must not run in the context of the first one
+            with NullContext():
+                self.io_loop = IOLoop.current()
+                self.timeout = self.io_loop.call_later(self.delay, self.flush)
+
+        return future
+
+    def flush(self):
+        '''
+        Sends the waiting documents right away. Returns a future that resolves to the
+        number of documents sent once they are inserted.
+        '''
+        self.cancel_timeout()
+
+        batch, self.pending = self.pending, []
+        flushed = Future()
+
+        if not batch:
+            flushed.set_result(0)
+            return flushed
+
+        self.in_flight += len(batch)
+
+        with NullContext():
+            IOLoop.current().add_future(
+                index_registry.sync(self.queryset, alias=self.alias),
+                self.handle_indexes_synced(batch, flushed)
+            )
+
+        return flushed
+
+    def cancel_timeout(self):
+        if self.timeout is not None:
+            # the timeout is removed from the loop it was scheduled in
+            self.io_loop.remove_timeout(self.timeout)
+            self.timeout = None
+            self.io_loop = None
+
+    def close(self):
+        '''
+        Fails the inserts of the waiting documents with a `WriteBufferClosedError`,
+        without sending them. Returns the number of documents dropped.
+        '''
+        self.cancel_timeout()
+        batch, self.pending = self.pending, []
+
+        for son, future in batch:
+            future.set_exception(WriteBufferClosedError(
+                "The write buffer of '%s' was closed before the document was inserted." % (
+                    self.queryset.__klass__.__name__
+                )
+            ))
+
+        return len(batch)
+
+    def handle_indexes_synced(self, batch, flushed):
+        def handle(indexes):
+            if indexes.exception() is not None:
+                self.fail(batch, flushed, indexes.exception())
+                return
+
+            self.queryset.coll(self.alias).insert_many(
+                [son for son, future in batch], ordered=False,
+                callback=self.handle_inserted(batch, flushed)
+            )
+
+        return handle
+
+    def fail(self, batch, flushed, error):
+        self.in_flight -= len(batch)
+
+        for son, future in batch:
+            future.set_exception(error)
+
+        flushed.set_result(len(batch))
+
+    def handle_inserted(self, batch, flushed):
+        def handle(*arguments, **kw):
+            failed = {}
+
+            if len(arguments) > 1 and arguments[1]:
+                if not isinstance(arguments[1], (BulkWriteError, )):
+                    self.fail(batch, flushed, arguments[1])
+                    return
+
+                for error in arguments[1].details.get('writeErrors', []):
+                    failed[error['index']] = error
+
+            self.in_flight -= len(batch)
+
+            for index, (son, future) in enumerate(batch):
+                error = failed.get(index)
+
+                if error is None:
+                    future.set_result(son['_id'])
+                elif error.get('code') == 11000:
+                    future.set_exception(DuplicateKeyError(error.get('errmsg'), error.get('code'), error))
+                else:
+                    future.set_exception(WriteError(error.get('errmsg'), error.get('code'), error))
+
+            flushed.set_result(len(batch))
+
+        return handle
+
+
+class WriteBufferRegistry(object):
+    '''
+    Keeps the write buffer of each document class (that declares `__write_buffer__`)
+    and connection alias.
+    '''
+
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, queryset, alias=None):
+        '''
+        Returns the write buffer for the queryset's document class and alias or None if
+        the document class does not use a write buffer.
+        '''
+        document_class = queryset.__klass__
+        options = getattr(document_class, '__write_buffer__', None)
+
+        if not options:
+            return None
+
+        if alias is None:
+            alias = document_class.__alias__ or DEFAULT_CONNECTION_NAME
+
+        key = (document_class, alias)
+        write_buffer = self.buffers.get(key)
+
+        if write_buffer is None:
+            options = options if isinstance(options, dict) else {}
+            write_buffer = self.buffers[key] = WriteBuffer(queryset, alias=alias, **options)
+
+        return write_buffer
+
+    def flush(self, alias=None):
+        return [
+            write_buffer.flush()
+            for (document_class, buffer_alias), write_buffer in list(self.buffers.items())
+            if alias is None or buffer_alias == alias
+        ]
+
+    def clear(self, alias=None):
+        '''
+        Closes and forgets the write buffers of the given alias (or of all aliases).
+        Documents still waiting in them fail with a `WriteBufferClosedError`.
+        '''
+        for key, write_buffer in list(self.buffers.items()):
+            if alias is None or key[1] == alias:
+                write_buffer.close()
+                del self.buffers[key]
+
+
+write_buffers = WriteBufferRegistry()
+
+
+def handle_flush_write_buffers(callback, futures, flushed):
+    def handle(future):
+        flushed.append(future)
+
+        if len(flushed) < len(futures):
+            return
+
+        callback(sum(future.result() for future in futures))
+
+    return handle
+
+
+@return_future
+def flush_write_buffers(callback=None, alias=None):
+    '''
+    Sends the documents waiting in the write buffers of all document classes (or only
+    the ones of the given alias). Should be called before shutting down (or before
+    `disconnect`), as documents still waiting when their connection is closed are not
+    inserted: their inserts fail with a `WriteBufferClosedError`.
+
+    Resolves to the number of documents sent once they are inserted.
+
+    Usage::
+
+        from motorengine import flush_write_buffers
+
+        yield flush_write_buffers()
+    '''
+    futures = write_buffers.flush(alias=alias)
+
+    if not futures:
+        callback(0)
+        return
+
+    flushed = []
+    io_loop = IOLoop.current()
+    for future in futures:
+        io_loop.add_future(future, handle_flush_write_buffers(callback, futures, flushed))
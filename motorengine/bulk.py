@@ -0,0 +1,473 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+
+from bson import BSON
+from easydict import EasyDict as edict
+from pymongo import InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany
+from pymongo.errors import BulkWriteError
+from tornado.concurrent import return_future
+from tornado.gen import convert_yielded
+from tornado.ioloop import IOLoop
+
+from motorengine.errors import InvalidDocumentError, BulkInsertError, LoadDeferredRequiredError
+from motorengine.stream import StopAsyncIteration
+
+DEFAULT_INSERT_CHUNK_SIZE = 1000
+DEFAULT_INSERT_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+class BulkOperation(object):
+    '''
+    Accumulates inserts, updates, replacements, upserts and deletes of documents of a
+    queryset class and sends them to MongoDB in a single bulk write.
+
+    Filters are specified with field names, either as a dict or as a `Q` object, and
+    updates are specified the same way as in `QuerySet.update`::
+
+        bulk = User.objects.bulk(ordered=False)
+        bulk.insert(User(name="Bernardo"))
+        bulk.update_one({"name": "Heynemann"}, inc__logins=1)
+        bulk.upsert(Q(email="rafael@gmail.com"), set__name="Rafael")
+        bulk.delete_many({"is_active": False})
+
+        result = yield bulk.execute()
+
+    In ordered mode (the default) the operations are executed in the order they were
+    added and the execution stops at the first error. In unordered mode all operations
+    are executed, in any order.
+    '''
+
+    def __init__(self, queryset, ordered=True):
+        self.queryset = queryset
+        self.ordered = ordered
+        self.requests = []
+        self.documents = {}
+
+    def __len__(self):
+        return len(self.requests)
+
+    def get_query(self, filters):
+        from motorengine import Q
+
+        if isinstance(filters, dict):
+            filters = Q(**filters)
+
+        return self.queryset.get_query_from_filters(filters)
+
+    def get_son(self, document, creating):
+        if document.get_deferred_fields():
+            raise LoadDeferredRequiredError(
+                "Document %s can't be written in full before its deferred fields are "
+                "loaded with 'load_deferred'" % document.__class__.__name__
+            )
+
+        try:
+            son = self.queryset.validate_and_serialize_document(document)
+            if son is None:
+                raise InvalidDocumentError("Document '%s' is not valid." % document.__class__.__name__)
+        except Exception:
+            err = sys.exc_info()[1]
+            raise ValueError("Validation for operation %d in the bulk operation failed with: %s" % (
+                len(self.requests),
+                str(err)
+            ))
+
+        self.queryset.update_field_on_save_values(document, creating, son=son)
+        return son
+
+    def add(self, request, document=None, son=None):
+        if document is not None:
+            self.documents[len(self.requests)] = (document, son)
+
+        self.requests.append(request)
+        return self
+
+    def insert(self, document):
+        '''
+        Inserts a new document. Its `_id` is set once the bulk operation is executed.
+        '''
+        son = self.get_son(document, False)
+        return self.add(InsertOne(son), document, son)
+
+    def update_one(self, filters, definition=None, upsert=False, **kwargs):
+        '''
+        Updates the first document that matches `filters`.
+        '''
+        update = self.queryset.get_update_document(definition, **kwargs)
+        return self.add(UpdateOne(self.get_query(filters), update, upsert=upsert))
+
+    def update_many(self, filters, definition=None, upsert=False, **kwargs):
+        '''
+        Updates all the documents that match `filters`.
+        '''
+        update = self.queryset.get_update_document(definition, **kwargs)
+        return self.add(UpdateMany(self.get_query(filters), update, upsert=upsert))
+
+    def upsert(self, filters, definition=None, **kwargs):
+        '''
+        Updates the first document that matches `filters` or inserts a new one if none does.
+        '''
+        return self.update_one(filters, definition, upsert=True, **kwargs)
+
+    def replace(self, filters, document, upsert=False):
+        '''
+        Replaces the first document that matches `filters` with `document`.
+        '''
+        return self.add(ReplaceOne(self.get_query(filters), self.get_son(document, True), upsert=upsert))
+
+    def save(self, document):
+        '''
+        Inserts the document if it was never saved or updates it otherwise, the same way
+        `Document.save` does (only the changed fields of loaded documents are sent).
+        '''
+        if document._id is None:
+            return self.insert(document)
+
+        changed_fields = document.get_changed_fields()
+        if changed_fields is None:
+            request = ReplaceOne({'_id': document._id}, self.get_son(document, True))
+            return self.add(request, document)
+
+        if not changed_fields:
+            return self
+
+        self.queryset.check_document_type(document)
+        if not document.validate_changes(changed_fields):
+            raise ValueError("Validation for operation %d in the bulk operation failed." % len(self.requests))
+
+        self.queryset.update_field_on_save_values(document, True)
+        request = UpdateOne({'_id': document._id}, document.get_update_for_changes(document.get_changed_fields()))
+        return self.add(request, document)
+
+    def delete_one(self, filters):
+        '''
+        Deletes the first document that matches `filters`.
+        '''
+        return self.add(DeleteOne(self.get_query(filters)))
+
+    def delete_many(self, filters):
+        '''
+        Deletes all the documents that match `filters`.
+        '''
+        return self.add(DeleteMany(self.get_query(filters)))
+
+    def get_result(self, details):
+        errors = [
+            edict({
+                'index': error['index'],
+                'code': error.get('code'),
+                'message': error.get('errmsg'),
+                'operation': type(self.requests[error['index']]).__name__,
+            })
+            for error in details.get('writeErrors', [])
+        ]
+
+        failed = set(error.index for error in errors)
+        executed = len(self.requests)
+        if self.ordered and errors:
+            executed = errors[0].index
+
+        for index, (document, son) in self.documents.items():
+            if index in failed or index >= executed:
+                continue
+
+            if document._id is None:
+                # the _id is set in the inserted son by pymongo
+                document._id = son['_id']
+            document.clear_changes()
+
+        return edict({
+            'inserted_count': details.get('nInserted', 0),
+            'matched_count': details.get('nMatched', 0),
+            'modified_count': details.get('nModified', 0),
+            'deleted_count': details.get('nRemoved', 0),
+            'upserted_count': details.get('nUpserted', 0),
+            'upserted': [
+                edict({'index': upserted['index'], '_id': upserted['_id']})
+                for upserted in details.get('upserted', [])
+            ],
+            'errors': errors,
+        })
+
+    def handle_execute(self, callback):
+        def handle(*arguments, **kw):
+            if len(arguments) > 1 and arguments[1]:
+                if not isinstance(arguments[1], (BulkWriteError, )):
+                    raise arguments[1]
+
+                callback(self.get_result(arguments[1].details))
+                return
+
+            callback(self.get_result(arguments[0].bulk_api_result))
+
+        return handle
+
+    def indexes_saved_before_execute(self, callback, alias=None):
+        def handle(*args, **kw):
+            self.queryset.coll(alias).bulk_write(
+                self.requests, ordered=self.ordered, callback=self.handle_execute(callback)
+            )
+
+        return handle
+
+    @return_future
+    def execute(self, callback=None, alias=None):
+        '''
+        Sends all the operations to MongoDB in a single bulk write.
+
+        Resolves to an object with the `inserted_count`, `matched_count`, `modified_count`,
+        `deleted_count` and `upserted_count` of the operations, the `upserted` documents
+        (with the `index` of their operation and their `_id`) and the `errors` of the
+        operations that failed (with their `index`, `code`, `message` and `operation`
+        type). Write errors do not raise.
+        '''
+        if not self.requests:
+            callback(self.get_result({}))
+            return
+
+        self.queryset.wait_for_indexes(
+            callback=self.indexes_saved_before_execute(callback, alias=alias),
+            alias=alias
+        )
+
+
+class BulkInsert(object):
+    '''
+    Inserts the documents of an iterable (or async iterator) in chunks of at most
+    `chunk_size` documents and `chunk_bytes` BSON bytes, with up to `concurrency`
+    chunks being inserted at the same time (for unordered inserts only).
+
+    Documents are only taken from the source when there is room for another chunk,
+    so slow inserts slow down the consumption of the source.
+
+    In ordered mode the insertion stops at the first document that fails validation
+    (raising a `ValueError`) or insertion (raising a `BulkInsertError`). Lists (and
+    tuples) are validated as a whole before the first chunk is sent, so nothing is
+    inserted if any of their documents is invalid; other sources are validated as
+    their documents are taken, so the chunks before an invalid document are inserted.
+    In unordered mode all the documents are tried and a `BulkInsertError` with all the
+    failures is raised at the end.
+    '''
+
+    def __init__(self, queryset, documents, callback, ordered=True, chunk_size=DEFAULT_INSERT_CHUNK_SIZE,
+                 chunk_bytes=DEFAULT_INSERT_CHUNK_BYTES, concurrency=1, alias=None):
+        if chunk_size is None or chunk_size < 1:
+            raise ValueError("The chunk_size argument must be a positive integer, not '%s'." % chunk_size)
+
+        if concurrency is None or concurrency < 1:
+            raise ValueError("The concurrency argument must be a positive integer, not '%s'." % concurrency)
+
+        self.queryset = queryset
+        self.callback = callback
+        self.ordered = ordered
+        self.chunk_size = chunk_size
+        self.chunk_bytes = chunk_bytes
+        self.concurrency = 1 if ordered else concurrency
+        self.alias = alias
+
+        self.documents = documents if isinstance(documents, (list, tuple)) else None
+
+        if hasattr(documents, '__aiter__'):
+            documents = documents.__aiter__()
+
+        self.is_async = hasattr(documents, '__anext__')
+        self.source = documents if self.is_async else iter(documents)
+
+        self.exhausted = False
+        self.finished = False
+        self.pulling = False
+        self.in_flight = 0
+        self.total = 0
+        self.inserted = 0
+        self.errors = []
+
+        self.chunk = []
+        self.chunk_size_in_bytes = 0
+
+        # SONs of the documents of lists validated before inserting (in ordered mode)
+        self.sons = None
+
+    def start(self):
+        if self.ordered and self.documents is not None:
+            self.sons = [
+                self.serialize_document(index, document)
+                for index, document in enumerate(self.documents)
+            ]
+
+        self.queryset.wait_for_indexes(callback=self.fill, alias=self.alias)
+
+    def add_error(self, index, document, message, code=None):
+        self.errors.append(edict({
+            'index': index,
+            'document': document,
+            'code': code,
+            'message': message,
+        }))
+
+    def serialize_document(self, index, document):
+        '''
+        Returns the SON of the document or None if it is not valid (in unordered mode).
+        '''
+        try:
+            if document.get_deferred_fields():
+                raise LoadDeferredRequiredError(
+                    "Document %s can't be written in full before its deferred fields are "
+                    "loaded with 'load_deferred'" % document.__class__.__name__
+                )
+
+            son = self.queryset.validate_and_serialize_document(document)
+            if son is None:
+                raise InvalidDocumentError("Document '%s' is not valid." % document.__class__.__name__)
+        except Exception:
+            err = sys.exc_info()[1]
+            message = "Validation for document %d in the documents you are saving failed with: %s" % (index, str(err))
+
+            if self.ordered:
+                self.finished = True
+                raise ValueError(message)
+
+            self.add_error(index, document, message)
+            return None
+
+        return son
+
+    def add_document(self, document):
+        '''
+        Adds a document to the current chunk, returning the chunk if it is full.
+        '''
+        index = self.total
+        self.total += 1
+
+        if self.sons is not None:
+            son = self.sons[index]
+        else:
+            son = self.serialize_document(index, document)
+            if son is None:
+                return None
+
+        size = len(BSON.encode(son))
+        chunk = None
+        if self.chunk and self.chunk_size_in_bytes + size > self.chunk_bytes:
+            chunk = self.take_chunk()
+
+        self.chunk.append((index, document, son))
+        self.chunk_size_in_bytes += size
+
+        if chunk is None and len(self.chunk) >= self.chunk_size:
+            chunk = self.take_chunk()
+
+        return chunk
+
+    def take_chunk(self):
+        chunk = self.chunk
+        self.chunk = []
+        self.chunk_size_in_bytes = 0
+        return chunk
+
+    def fill(self, *args, **kw):
+        if self.pulling:
+            return
+
+        while not self.finished and self.in_flight < self.concurrency:
+            if self.exhausted:
+                if not self.chunk:
+                    break
+                self.send(self.take_chunk())
+                continue
+
+            if self.is_async:
+                self.pulling = True
+                IOLoop.current().add_future(convert_yielded(self.source.__anext__()), self.handle_next_document)
+                return
+
+            chunk = None
+            while chunk is None and not self.exhausted:
+                try:
+                    document = next(self.source)
+                except StopIteration:
+                    self.exhausted = True
+                else:
+                    chunk = self.add_document(document)
+
+            if chunk:
+                self.send(chunk)
+
+        self.finish()
+
+    def handle_next_document(self, future):
+        self.pulling = False
+
+        error = future.exception()
+        if isinstance(error, (StopAsyncIteration, StopIteration)):
+            self.exhausted = True
+        elif error is not None:
+            self.finished = True
+            raise error
+        else:
+            chunk = self.add_document(future.result())
+            if chunk:
+                self.send(chunk)
+
+        self.fill()
+
+    def send(self, chunk):
+        self.in_flight += 1
+        self.queryset.coll(self.alias).insert_many(
+            [son for index, document, son in chunk], ordered=self.ordered,
+            callback=self.handle_inserted_chunk(chunk)
+        )
+
+    def handle_inserted_chunk(self, chunk):
+        def handle(*arguments, **kw):
+            self.in_flight -= 1
+
+            if self.finished:
+                return
+
+            failed = {}
+            if len(arguments) > 1 and arguments[1]:
+                if not isinstance(arguments[1], (BulkWriteError, )):
+                    self.finished = True
+                    raise arguments[1]
+
+                for error in arguments[1].details.get('writeErrors', []):
+                    failed[error['index']] = error
+
+            for chunk_index, (index, document, son) in enumerate(chunk):
+                if chunk_index in failed:
+                    error = failed[chunk_index]
+                    self.add_error(index, document, error.get('errmsg'), code=error.get('code'))
+                    continue
+
+                # in ordered mode the documents after the first error are not inserted
+                if self.ordered and failed and chunk_index > min(failed):
+                    continue
+
+                # the _id is set in the inserted son by pymongo
+                document._id = son['_id']
+                document.clear_changes()
+                self.inserted += 1
+
+            if self.ordered and failed:
+                self.exhausted = True
+                self.chunk = []
+
+            self.fill()
+
+        return handle
+
+    def finish(self):
+        if self.finished or self.in_flight or self.pulling or not self.exhausted or self.chunk:
+            return
+
+        self.finished = True
+
+        if self.errors:
+            raise BulkInsertError(sorted(self.errors, key=lambda error: error.index), self.inserted)
+
+        if self.documents is not None:
+            self.callback(self.documents)
+        else:
+            self.callback(self.inserted)
@@ -38,20 +38,30 @@ def register_connection(db, alias, **kwargs):
 
 
 def cleanup():
+    from motorengine.buffer import write_buffers
+    from motorengine.indexes import index_registry
+
     global _connections
     global _connection_settings
     global _default_dbs
 
+    index_registry.clear()
+    write_buffers.clear()
     _connections = {}
     _connection_settings = {}
     _default_dbs = {}
 
 
 def disconnect(alias=DEFAULT_CONNECTION_NAME):
+    from motorengine.buffer import write_buffers
+    from motorengine.indexes import index_registry
+
     global _connections
     global _connections_settings
     global _default_dbs
 
+    index_registry.clear(alias)
+    write_buffers.clear(alias)
     if alias in _connections:
         _connections[alias].close()
         del _connections[alias]
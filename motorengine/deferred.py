@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from tornado.concurrent import Future
+
+
+class DeferredFields(object):
+    '''
+    Fields left out of the documents of a result set loaded with `QuerySet.defer`.
+
+    Reading a deferred field of any of the documents raises `LoadDeferredRequiredError`
+    until `load_deferred` is called on one of them, which loads the deferred fields of
+    all the documents of the result set with a single `{'_id': {'$in': [...]}}` query.
+    '''
+
+    def __init__(self, document_type, fields, alias=None):
+        self.document_type = document_type
+        self.fields = frozenset(fields)
+        self.alias = alias
+        self.documents = []
+        self.future = None
+
+    def add(self, document):
+        values = document._values
+
+        # from_son applies the defaults of the fields missing from the SON
+        for name in self.fields:
+            values.pop(name, None)
+
+        object.__setattr__(document, '_deferred', self)
+        self.documents.append(document)
+
+    def is_deferred(self, document, name):
+        return name in self.fields and name not in document._values
+
+    def get_projection(self):
+        projection = dict(
+            (self.document_type._fields[name].db_field, True) for name in self.fields
+        )
+        projection['_id'] = True
+
+        return projection
+
+    def load(self, alias=None):
+        '''
+        Loads the deferred fields of all the documents (only once, no matter how many
+        times it is called). Returns a future that resolves to the number of documents
+        loaded.
+        '''
+        if self.future is not None:
+            return self.future
+
+        self.future = Future()
+        ids = [document._id for document in self.documents]
+
+        cursor = self.document_type.objects.coll(alias or self.alias).find(
+            {'_id': {'$in': ids}}, projection=self.get_projection()
+        )
+        cursor.to_list(len(ids), callback=self.handle_load)
+
+        return self.future
+
+    def handle_load(self, *arguments, **kw):
+        if len(arguments) > 1 and arguments[1]:
+            future, self.future = self.future, None
+            future.set_exception(arguments[1])
+            return
+
+        sons = dict((son['_id'], son) for son in arguments[0])
+        documents, self.documents = self.documents, []
+
+        for document in documents:
+            self.set_values(document, sons.get(document._id, {}))
+            object.__setattr__(document, '_deferred', None)
+
+        self.future.set_result(len(documents))
+
+    def set_values(self, document, son):
+        values = document._values
+        hydration_plan = self.document_type._hydration_plan
+        default_values = dict(
+            (field_name, (default, is_callable))
+            for field_name, default, is_callable in self.document_type._default_values
+        )
+
+        for name in self.fields:
+            # fields set before being loaded keep their new values
+            if name in values:
+                continue
+
+            field = self.document_type._fields[name]
+
+            if field.db_field not in son:
+                default, is_callable = default_values[name]
+                values[name] = default() if is_callable else default
+                continue
+
+            from_son = hydration_plan[field.db_field][1]
+            value = son[field.db_field]
+            values[name] = value if from_son is None else from_son(value)
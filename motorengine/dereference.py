@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from motorengine.query_builder.field_list import QueryFieldList
+from motorengine.session import get_current_session
+
+
+class Dereference(object):
+    '''
+    Collects the references pending in one or more documents and resolves them
+    with a single `{'_id': {'$in': [...]}}` query per referenced document type
+    (and projection), filling the values of every referencing document in place.
+
+    Documents already in the active session (if any) are not queried again.
+    '''
+
+    def __init__(self, alias=None):
+        self.alias = alias
+        self.groups = {}
+        self.references = []
+
+    def __len__(self):
+        return len(self.references)
+
+    def get_projection_key(self, projection):
+        if not projection:
+            return None
+
+        return tuple(sorted(
+            (field_name, repr(value)) for field_name, value in projection.items()
+        ))
+
+    def add(self, document_type, object_id, values_collection, field_name, index=None, projection=None):
+        key = (document_type, self.get_projection_key(projection))
+
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = {
+                'document_type': document_type,
+                'projection': projection,
+                'ids': [],
+                'loaded': {},
+                'exclude_id': False,
+            }
+
+        if object_id not in group['loaded']:
+            group['loaded'][object_id] = None
+            group['ids'].append(object_id)
+
+        self.references.append((group, object_id, values_collection, field_name, index))
+
+    def fill_values(self):
+        for group, object_id, values_collection, field_name, index in self.references:
+            value = group['loaded'].get(object_id)
+
+            if index is None:
+                values_collection[field_name] = value
+            else:
+                # loading references does not change the document
+                list.__setitem__(values_collection[field_name], index, value)
+
+    def handle_load_group(self, group, pending_groups, callback):
+        def handle(*arguments, **kw):
+            for document in arguments[0]:
+                group['loaded'][document._id] = document
+
+                if group['exclude_id']:
+                    document._id = None
+                    document.is_partly_loaded = True
+
+            self.handle_group_loaded(group, pending_groups, callback)
+
+        return handle
+
+    def handle_group_loaded(self, group, pending_groups, callback):
+        pending_groups.remove(id(group))
+
+        if not pending_groups:
+            self.fill_values()
+            callback(len(self.references))
+
+    def load_from_session(self, group, session):
+        '''
+        Fills the documents of the group found in the session and returns the ids
+        still to be queried.
+        '''
+        document_type = group['document_type']
+        loaded = group['loaded']
+        ids = []
+
+        for object_id in group['ids']:
+            document = session.get(document_type, object_id, alias=self.alias)
+
+            if document is None:
+                ids.append(object_id)
+            else:
+                loaded[object_id] = document
+
+        return ids
+
+    def load(self, callback):
+        if not self.references:
+            callback(0)
+            return
+
+        session = get_current_session()
+        pending_groups = set(id(group) for group in self.groups.values())
+
+        for group in list(self.groups.values()):
+            ids = group['ids']
+
+            # only fully loaded documents are kept in the session
+            if session is not None and not group['projection']:
+                ids = self.load_from_session(group, session)
+
+                if not ids:
+                    self.handle_group_loaded(group, pending_groups, callback)
+                    continue
+
+            queryset = group['document_type'].objects
+
+            projection = group['projection']
+            if projection and projection.get('_id') == QueryFieldList.EXCLUDE:
+                # references are matched by _id, so it is loaded and cleared afterwards
+                projection = dict(projection)
+                del projection['_id']
+                group['exclude_id'] = True
+
+            if projection:
+                queryset = queryset.fields(**projection)
+
+            queryset.filter({'_id': {'$in': ids}}).limit(len(ids)).find_all(
+                callback=self.handle_load_group(group, pending_groups, callback),
+                alias=self.alias
+            )
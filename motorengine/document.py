@@ -2,17 +2,38 @@
 
 import six
 from tornado.concurrent import return_future
+from tornado.ioloop import IOLoop
 
 from motorengine.metaclasses import DocumentMetaClass
-from motorengine.errors import InvalidDocumentError, LoadReferencesRequiredError
+from motorengine.dereference import Dereference
+from motorengine.errors import InvalidDocumentError
+from motorengine.fields.dynamic_field import get_dynamic_field
+from motorengine.tracking import has_value_changed, clear_value_changes
+from motorengine.values import DecodedSon, DecodedValues, LazyEmbeddedDocument
 
 
 AUTHORIZED_FIELDS = [
-    '_id', '_values', '_reference_loaded_fields', 'is_partly_loaded'
+    '_id', '_values', '_reference_loaded_fields', 'is_partly_loaded', '_changed_fields', '_dynamic_values',
+    '_deferred'
 ]
 
+# changes of documents loaded from or saved to the database are tracked, starting from
+# an empty tuple (shared by all unchanged documents) that is replaced by a set of field
+# names when the first field changes. Documents that were never saved are not tracked.
+NO_CHANGES = ()
+
+
+def get_instance_dynamic_field(name):
+    return get_dynamic_field("_%s" % name.lstrip('_'))
+
 
 class BaseDocument(object):
+    # documents keep their instance __dict__ unless declared with __compact__ = True
+    __slots__ = ()
+
+    # fields left out by QuerySet.defer (see motorengine.deferred.DeferredFields)
+    _deferred = None
+
     def __init__(
         self, _is_partly_loaded=False, _reference_loaded_fields=None, **kw
     ):
@@ -23,37 +44,23 @@ class BaseDocument(object):
         reference fields if any. Default: None.
         :param kw: pairs of fields of the document and their values
         """
-        from motorengine.fields.dynamic_field import DynamicField
-
         self._id = kw.pop('_id', None)
         self._values = {}
+        self._changed_fields = None
         self.is_partly_loaded = _is_partly_loaded
 
-        if _reference_loaded_fields:
+        if _reference_loaded_fields is not None:
             self._reference_loaded_fields = _reference_loaded_fields
         else:
             self._reference_loaded_fields = {}
 
-        for key, field in self._fields.items():
-            if callable(field.default):
-                self._values[field.name] = field.default()
-            else:
-                self._values[field.name] = field.default
+        for field_name, default, is_callable in self._default_values:
+            self._values[field_name] = default() if is_callable else default
 
+        # unknown keys are kept as dynamic fields of this instance only
         for key, value in kw.items():
-            if key not in self._fields:
-                self._fields[key] = DynamicField(db_field="_%s" % key.lstrip('_'))
             self._values[key] = value
 
-    @classmethod
-    @return_future
-    def ensure_index(cls, callback=None):
-        cls.objects.ensure_index(callback=callback)
-
-    @property
-    def is_lazy(self):
-        return self.__class__.__lazy__
-
     def is_list_field(self, field):
         from motorengine.fields.list_field import ListField
         return isinstance(field, ListField) or (isinstance(field, type) and issubclass(field, ListField))
@@ -68,152 +75,355 @@ class BaseDocument(object):
 
     @classmethod
     def from_son(cls, dic, _is_partly_loaded=False, _reference_loaded_fields=None):
-        field_values = {}
+        if type(dic) is DecodedSon and cls._decodes_values:
+            return cls.from_decoded_values(dic, _is_partly_loaded, _reference_loaded_fields)
+
         _object_id = dic.pop('_id', None)
+        values = cls.hydrate_values(dic)
+
+        if cls._has_custom_init:
+            values["_id"] = _object_id
+            document = cls(
+                _is_partly_loaded=_is_partly_loaded,
+                _reference_loaded_fields=_reference_loaded_fields,
+                **values
+            )
+            document._changed_fields = NO_CHANGES
+            return document
+
+        for field_name, default, is_callable in cls._default_values:
+            if field_name not in values:
+                values[field_name] = default() if is_callable else default
+
+        if _reference_loaded_fields is None:
+            _reference_loaded_fields = {}
+
+        # skips __init__, as values are already converted and defaults applied
+        document = cls.__new__(cls)
+        object.__setattr__(document, '_id', _object_id)
+        object.__setattr__(document, '_values', values)
+        object.__setattr__(document, 'is_partly_loaded', _is_partly_loaded)
+        object.__setattr__(document, '_reference_loaded_fields', _reference_loaded_fields)
+        object.__setattr__(document, '_changed_fields', NO_CHANGES)
+
+        return document
+
+    @classmethod
+    def hydrate_values(cls, dic):
+        '''
+        Returns the values of a SON keyed by field name and converted with the
+        `from_son` of the fields (see `_hydration_plan`).
+        '''
+        values = {}
+        hydration_plan = cls._hydration_plan
+
         for name, value in dic.items():
-            field = cls.get_field_by_db_name(name)
-            if field:
-                field_values[field.name] = field.from_son(value)
-            else:
-                field_values[name] = value
-        field_values["_id"] = _object_id
-
-        return cls(
-            _is_partly_loaded=_is_partly_loaded,
-            _reference_loaded_fields=_reference_loaded_fields,
-            **field_values
-        )
+            plan = hydration_plan.get(name)
+            if plan is None:
+                plan = hydration_plan.get(name.lstrip("_"))
 
-    def to_son(self):
-        data = dict()
+            if plan is not None:
+                field_name, from_son = plan
+                values[field_name] = value if from_son is None else from_son(value)
+                continue
+
+            # dynamic fields are stored prefixed with "_" (see get_instance_dynamic_field)
+            dynamic_name = name.lstrip("_")
+            values[name if dynamic_name in cls._fields else dynamic_name] = value
+
+        return values
 
-        for name, field in self._fields.items():
-            value = self.get_field_value(name)
-            if field.sparse and value is None:
+    @classmethod
+    def from_decoded_values(cls, values, _is_partly_loaded=False, _reference_loaded_fields=None):
+        '''
+        Creates a document that uses the `DecodedSon` pymongo decoded the SON into as
+        its values (turned into `DecodedValues`), renaming database fields to field
+        names in place and leaving the `from_son` conversions to be applied when each
+        value is first read.
+        '''
+        _object_id = dict.pop(values, '_id', None)
+        hydration_plan = cls._hydration_plan
+        converters = None
+        renamed = None
+
+        for name in values:
+            plan = hydration_plan.get(name)
+            if plan is not None and plan[0] == name:
+                if plan[1] is not None:
+                    if converters is None:
+                        converters = {}
+                    converters[name] = plan[1]
                 continue
-            data[field.db_field] = field.to_son(value)
 
-        return data
+            if renamed is None:
+                renamed = []
+            renamed.append(name)
 
-    def validate(self):
-        return self.validate_fields()
+        if renamed is not None:
+            for name in renamed:
+                value = dict.pop(values, name)
+                field_name, from_son = cls.get_son_key_plan(name)
 
-    def validate_fields(self):
-        for name, field in self._fields.items():
+                if from_son is not None:
+                    if converters is None:
+                        converters = {}
+                    converters[field_name] = from_son
 
-            value = self.get_field_value(name)
+                dict.__setitem__(values, field_name, value)
 
-            if field.required and field.is_empty(value):
-                raise InvalidDocumentError("Field '%s' is required." % name)
-            if not field.validate(value):
-                raise InvalidDocumentError("Field '%s' must be valid." % name)
+        values.__class__ = DecodedValues
+        values.converters = converters
 
-        return True
+        for field_name, default, is_callable in cls._default_values:
+            if field_name not in values:
+                dict.__setitem__(values, field_name, default() if is_callable else default)
 
-    @return_future
-    def save(self, callback, alias=None, upsert=False):
+        if _reference_loaded_fields is None:
+            _reference_loaded_fields = {}
+
+        document = cls.__new__(cls)
+        object.__setattr__(document, '_id', _object_id)
+        object.__setattr__(document, '_values', values)
+        object.__setattr__(document, 'is_partly_loaded', _is_partly_loaded)
+        object.__setattr__(document, '_reference_loaded_fields', _reference_loaded_fields)
+        object.__setattr__(document, '_changed_fields', NO_CHANGES)
+
+        return document
+
+    @classmethod
+    def get_son_key_plan(cls, name):
         '''
-        Creates or updates the current instance of this document.
+        Returns the field name and `from_son` converter (or None) for a key of a SON
+        that is not the database field of a declared field with the same name.
         '''
-        self.objects.save(self, callback=callback, alias=alias, upsert=upsert)
+        plan = cls._hydration_plan.get(name)
+        if plan is None:
+            plan = cls._hydration_plan.get(name.lstrip("_"))
 
-    @return_future
-    def delete(self, callback, alias=None):
+        if plan is not None:
+            return plan
+
+        # dynamic fields are stored prefixed with "_" (see get_instance_dynamic_field)
+        dynamic_name = name.lstrip("_")
+        return (name if dynamic_name in cls._fields else dynamic_name), None
+
+    @classmethod
+    def get_values_from_son(cls, dic, convert=False):
         '''
-        Deletes the current instance of this Document.
+        Returns the values of a SON (as returned by pymongo) keyed by field name instead of
+        database field name, without creating a document. The values are only converted
+        with the fields `from_son` (i.e.: embedded documents) if `convert` is True.
+        '''
+        values = {}
+        reverse_db_field_map = cls._reverse_db_field_map
 
-        .. testsetup:: saving_delete_one
+        for name, value in dic.items():
+            if name == '_id':
+                values[name] = value
+                continue
 
-            import tornado.ioloop
-            from motorengine import *
+            field_name = reverse_db_field_map.get(name)
+            if field_name is None:
+                field_name = reverse_db_field_map.get(name.lstrip("_"))
 
-            class User(Document):
-                __collection__ = "UserDeletingInstance"
-                name = StringField()
+            if field_name is not None:
+                values[field_name] = value if not convert else cls._fields[field_name].from_son(value)
+                continue
 
-            io_loop = tornado.ioloop.IOLoop.instance()
-            connect("test", host="localhost", port=27017, io_loop=io_loop)
+            # dynamic fields are stored prefixed with "_" (see get_instance_dynamic_field)
+            dynamic_name = name.lstrip("_")
+            values[name if dynamic_name in cls._fields else dynamic_name] = value
 
-        .. testcode:: saving_delete_one
+        return values
 
-            def handle_user_created(user):
-                user.delete(callback=handle_user_deleted)
+    def mark_as_changed(self, name):
+        changed_fields = self._changed_fields
 
-            def handle_user_deleted(number_of_deleted_items):
-                try:
-                    assert number_of_deleted_items == 1
-                finally:
-                    io_loop.stop()
+        if changed_fields is None:
+            # documents that were never saved are saved in full
+            return
 
-            def create_user():
-                user = User(name="Bernardo")
-                user.save(callback=handle_user_created)
+        if changed_fields is NO_CHANGES:
+            changed_fields = set()
+            object.__setattr__(self, '_changed_fields', changed_fields)
 
-            io_loop.add_timeout(1, create_user)
-            io_loop.start()
+        changed_fields.add(name)
+
+    def get_changed_fields(self):
         '''
-        self.objects.remove(instance=self, callback=callback, alias=alias)
+        Returns the names of the fields changed since the document was loaded or last
+        saved (or None if the document was never saved), including lists and embedded
+        documents changed in place.
+        '''
+        changed_fields = self._changed_fields
 
-    def fill_values_collection(self, collection, field_name, value):
-        collection[field_name] = value
+        if changed_fields is None:
+            return None
 
-    def fill_list_values_collection(self, collection, field_name, value):
-        if field_name not in collection:
-            collection[field_name] = []
-        collection[field_name].append(value)
+        changed_fields = set(changed_fields)
+        reference_fields = self._reference_fields
 
-    def handle_load_reference(self, callback, references, reference_count, values_collection, field_name, fill_values_method=None):
-        if fill_values_method is None:
-            fill_values_method = self.fill_values_collection
+        for name, value in self._values.items():
+            if name not in changed_fields and \
+                    has_value_changed(value, check_documents=name not in reference_fields):
+                changed_fields.add(name)
 
-        def handle(*args, **kw):
-            fill_values_method(values_collection, field_name, args[0])
+        return changed_fields
 
-            if reference_count > 0:
-                references.pop()
+    def has_changed(self):
+        changed_fields = self.get_changed_fields()
 
-            if len(references) == 0:
-                callback({
-                    'loaded_reference_count': reference_count,
-                    'loaded_values': values_collection
-                })
+        return changed_fields is None or bool(changed_fields)
 
-        return handle
+    def clear_changes(self):
+        '''
+        Marks the document (and its lists and embedded documents) as saved.
+        '''
+        object.__setattr__(self, '_changed_fields', NO_CHANGES)
 
-    @return_future
-    def load_references(self, fields=None, callback=None, alias=None):
-        if callback is None:
-            raise ValueError("Callback can't be None")
+        reference_fields = self._reference_fields
+        for name, value in self._values.items():
+            clear_value_changes(value, clear_documents=name not in reference_fields)
 
-        references = self.find_references(document=self, fields=fields)
-        reference_count = len(references)
+    def validate_changes(self, changed_fields):
+        '''
+        Validates only the given changed fields, unless the document class overrides
+        `validate` or `validate_fields`, in which case the whole document is validated.
+        '''
+        if self._has_custom_validate:
+            return self.validate()
 
-        if not reference_count:
-            callback({
-                'loaded_reference_count': reference_count,
-                'loaded_values': []
-            })
-            return
+        values = self._values
+        plan = self._serialization_plan_map
 
-        for dereference_function, document_id, values_collection, field_name, fill_values_method in references:
-            dereference_function(
-                document_id,
-                callback=self.handle_load_reference(
-                    callback=callback,
-                    references=references,
-                    reference_count=reference_count,
-                    values_collection=values_collection,
-                    field_name=field_name,
-                    fill_values_method=fill_values_method
-                )
-            )
+        for name in changed_fields:
+            if name not in plan:
+                continue
 
-    def find_references(self, document, fields=None, results=None):
-        if results is None:
-            results = []
+            name, db_field, get_value, to_son, sparse, is_empty, validate = plan[name]
+            value = values.get(name, None)
+            if get_value is not None:
+                value = get_value(value)
+            if is_empty is not None and is_empty(value):
+                raise InvalidDocumentError("Field '%s' is required." % name)
+            if validate is not None and not validate(value):
+                raise InvalidDocumentError("Field '%s' must be valid." % name)
+
+        return True
 
-        if not isinstance(document, Document):
-            return results
+    def get_update_for_changes(self, changed_fields):
+        '''
+        Returns the `$set`/`$unset` update definition for the given changed fields.
+        '''
+        values = self._values
+        plan = self._serialization_plan_map
+        set_values = {}
+        unset_values = {}
+
+        for name in changed_fields:
+            if name not in plan:
+                field = get_instance_dynamic_field(name)
+                set_values[field.db_field] = field.to_son(values.get(name, None))
+                continue
+
+            name, db_field, get_value, to_son, sparse, is_empty, validate = plan[name]
+            value = values.get(name, None)
+            if get_value is not None:
+                value = get_value(value)
+            if sparse and value is None:
+                unset_values[db_field] = ""
+                continue
+            set_values[db_field] = value if to_son is None else to_son(value)
+
+        update = {}
+        if set_values:
+            update['$set'] = set_values
+        if unset_values:
+            update['$unset'] = unset_values
+
+        return update
+
+    def get_dynamic_fields(self):
+        '''
+        Returns (name, field) pairs for the dynamic fields set in this instance.
+        '''
+        fields = self._fields
+
+        return [
+            (name, get_instance_dynamic_field(name)) for name in self._values
+            if name not in fields
+        ]
+
+    def to_son(self):
+        data = dict()
+        values = self._values
+
+        for name, db_field, get_value, to_son, sparse, is_empty, validate in self._serialization_plan:
+            value = values.get(name, None)
+            if get_value is not None:
+                value = get_value(value)
+            if sparse and value is None:
+                continue
+            data[db_field] = value if to_son is None else to_son(value)
+
+        for name, field in self.get_dynamic_fields():
+            data[field.db_field] = field.to_son(self.get_field_value(name))
+
+        return data
+
+    def validate(self):
+        return self.validate_fields()
+
+    def validate_fields(self):
+        values = self._values
+
+        for name, db_field, get_value, to_son, sparse, is_empty, validate in self._serialization_plan:
+            value = values.get(name, None)
+            if get_value is not None:
+                value = get_value(value)
+            if is_empty is not None and is_empty(value):
+                raise InvalidDocumentError("Field '%s' is required." % name)
+            if validate is not None and not validate(value):
+                raise InvalidDocumentError("Field '%s' must be valid." % name)
+
+        return True
+
+    def validate_and_to_son(self):
+        '''
+        Validates the document and returns its SON representation (or None if
+        `validate` returns False) in a single pass over the document values.
+        '''
+        if self._has_custom_validate:
+            if not self.validate():
+                return None
+            return self.to_son()
+
+        data = dict()
+        values = self._values
+
+        for name, db_field, get_value, to_son, sparse, is_empty, validate in self._serialization_plan:
+            value = values.get(name, None)
+            if get_value is not None:
+                value = get_value(value)
+            if is_empty is not None and is_empty(value):
+                raise InvalidDocumentError("Field '%s' is required." % name)
+            if validate is not None and not validate(value):
+                raise InvalidDocumentError("Field '%s' must be valid." % name)
+            if sparse and value is None:
+                continue
+            data[db_field] = value if to_son is None else to_son(value)
+
+        for name, field in self.get_dynamic_fields():
+            data[field.db_field] = field.to_son(self.get_field_value(name))
+
+        return data
+
+    def find_references(self, document, fields=None, dereference=None):
+        if dereference is None:
+            dereference = Dereference()
+
+        if not isinstance(document, BaseDocument):
+            return dereference
 
         if fields:
             fields = [
@@ -225,109 +435,88 @@ class BaseDocument(object):
             fields = [field for field in document._fields.items()]
 
         for field_name, field in fields:
-            self.find_reference_field(document, results, field_name, field)
-            self.find_list_field(document, results, field_name, field)
-            self.find_embed_field(document, results, field_name, field)
+            self.find_reference_field(document, dereference, field_name, field)
+            self.find_list_field(document, dereference, field_name, field)
+            self.find_embed_field(document, dereference, field_name, field)
 
-        return results
+        return dereference
 
-    def _get_load_function(self, document, field_name, document_type):
-        """Get appropriate method to load reference field of the document"""
-        if field_name in document._reference_loaded_fields:
-            # there is a projection for this field
-            fields = document._reference_loaded_fields[field_name]
-            return document_type.objects.fields(**fields).get
-        return document_type.objects.get
-
-    def find_reference_field(self, document, results, field_name, field):
+    def find_reference_field(self, document, dereference, field_name, field):
         if self.is_reference_field(field):
             value = document._values.get(field_name, None)
-            load_function = self._get_load_function(
-                document, field_name, field.reference_type
-            )
-            if value is not None:
-                results.append([
-                    load_function,
-                    value,
-                    document._values,
-                    field_name,
-                    None
-                ])
-
-    def find_list_field(self, document, results, field_name, field):
+            document_type = field.reference_type
+
+            if value is not None and not isinstance(value, document_type):
+                dereference.add(
+                    document_type, value, document._values, field_name,
+                    projection=document._reference_loaded_fields.get(field_name)
+                )
+
+    def find_list_field(self, document, dereference, field_name, field):
         from motorengine.fields.reference_field import ReferenceField
         if self.is_list_field(field):
             values = document._values.get(field_name)
             if values:
-                document_type = values[0].__class__
                 if isinstance(field._base_field, ReferenceField):
                     document_type = field._base_field.reference_type
-                    load_function = self._get_load_function(
-                        document, field_name, document_type
-                    )
-                    for value in values:
-                        results.append([
-                            load_function,
-                            value,
-                            document._values,
-                            field_name,
-                            self.fill_list_values_collection
-                        ])
-                    document._values[field_name] = []
+                    projection = document._reference_loaded_fields.get(field_name)
+                    for index, value in enumerate(values):
+                        if value is None or isinstance(value, document_type):
+                            continue
+
+                        dereference.add(
+                            document_type, value, document._values, field_name,
+                            index=index, projection=projection
+                        )
                 else:
-                    self.find_references(document=document_type, results=results)
+                    for value in values:
+                        self.find_references(document=value, dereference=dereference)
 
-    def find_embed_field(self, document, results, field_name, field):
+    def find_embed_field(self, document, dereference, field_name, field):
         if self.is_embedded_field(field):
             value = document._values.get(field_name, None)
+            if isinstance(value, LazyEmbeddedDocument):
+                # the embedded document is hydrated to look for its references
+                value = getattr(document, field_name)
             if value:
-                self.find_references(document=value, results=results)
+                self.find_references(document=value, dereference=dereference)
 
     def get_field_value(self, name):
-        if name not in self._fields:
-            raise ValueError("Field %s not found in instance of %s." % (
-                name,
-                self.__class__.__name__
-            ))
+        field = self._fields.get(name)
 
-        field = self._fields[name]
-        value = field.get_value(self._values.get(name, None))
-
-        return value
+        if field is None:
+            if name not in self._values:
+                raise ValueError("Field %s not found in instance of %s." % (
+                    name,
+                    self.__class__.__name__
+                ))
+            field = get_instance_dynamic_field(name)
 
-    def __getattribute__(self, name):
-        # required for the next test
-        if name in ['_fields']:
-            return object.__getattribute__(self, name)
+        value = self._values.get(name, None)
+        if isinstance(value, LazyEmbeddedDocument):
+            return getattr(self, name)
 
-        if name in self._fields:
-            field = self._fields[name]
-            is_reference_field = self.is_reference_field(field)
-            value = field.get_value(self._values.get(name, None))
+        value = field.get_value(value)
 
-            if is_reference_field and value is not None and not isinstance(value, field.reference_type):
-                message = "The property '%s' can't be accessed before calling 'load_references'" + \
-                    " on its instance first (%s) or setting __lazy__ to False in the %s class."
-
-                raise LoadReferencesRequiredError(
-                    message % (name, self.__class__.__name__, self.__class__.__name__)
-                )
+        return value
 
-            return value
+    def __getattr__(self, name):
+        # declared fields are read through descriptors, so only dynamic fields get here
+        if name not in AUTHORIZED_FIELDS:
+            values = self._values
+            if name in values:
+                return values[name]
 
-        return object.__getattribute__(self, name)
+        raise AttributeError("'%s' object has no attribute '%s'" % (self.__class__.__name__, name))
 
     def __setattr__(self, name, value):
-        from motorengine.fields.dynamic_field import DynamicField
-
-        if name not in AUTHORIZED_FIELDS and name not in self._fields:
-            self._fields[name] = DynamicField(db_field="_%s" % name)
-
-        if name in self._fields:
-            self._values[name] = value
+        if name in AUTHORIZED_FIELDS:
+            object.__setattr__(self, name, value)
             return
 
-        object.__setattr__(self, name, value)
+        # declared and dynamic fields of this instance are all kept in its values
+        self._values[name] = value
+        self.mark_as_changed(name)
 
     @classmethod
     def get_field_by_db_name(cls, name):
@@ -339,19 +528,19 @@ class BaseDocument(object):
     @classmethod
     def get_fields(cls, name, fields=None):
         from motorengine import EmbeddedDocumentField, ListField
-        from motorengine.fields.dynamic_field import DynamicField
 
         if fields is None:
             fields = []
 
         if '.' not in name:
-            dyn_field = DynamicField(db_field="_%s" % name)
-            fields.append(cls._fields.get(name, dyn_field))
+            field = cls._fields.get(name)
+            fields.append(field if field is not None else get_dynamic_field("_%s" % name))
             return fields
 
         field_values = name.split('.')
-        dyn_field = DynamicField(db_field="_%s" % field_values[0])
-        obj = cls._fields.get(field_values[0], dyn_field)
+        obj = cls._fields.get(field_values[0])
+        if obj is None:
+            obj = get_dynamic_field("_%s" % field_values[0])
         fields.append(obj)
 
         if isinstance(obj, (EmbeddedDocumentField, )):
@@ -366,5 +555,202 @@ class BaseDocument(object):
 class Document(six.with_metaclass(DocumentMetaClass, BaseDocument)):
     '''
     Base class for all documents specified in MotorEngine.
+
+    Declaring `__compact__ = True` in a document class stores the field values of its
+    instances in slots instead of an instance `__dict__` and a values dict, which
+    considerably reduces the memory used by each instance::
+
+        class User(Document):
+            __compact__ = True
+
+            name = StringField()
+
+    Dynamic fields of compact documents are kept in a dict that is only allocated
+    when the first dynamic field is set.
+    '''
+    __slots__ = ()
+
+    @classmethod
+    @return_future
+    def ensure_index(cls, callback=None):
+        cls.objects.ensure_index(callback=callback)
+
+    @classmethod
+    @return_future
+    def sync_indexes(cls, callback=None, alias=None):
+        cls.objects.sync_indexes(callback=callback, alias=alias)
+
+    @property
+    def is_lazy(self):
+        return self.__class__.__lazy__
+
+    @return_future
+    def save(self, callback, alias=None, upsert=False):
+        '''
+        Creates or updates the current instance of this document.
+        '''
+        self.objects.save(self, callback=callback, alias=alias, upsert=upsert)
+
+    @return_future
+    def delete(self, callback, alias=None):
+        '''
+        Deletes the current instance of this Document.
+
+        .. testsetup:: saving_delete_one
+
+            import tornado.ioloop
+            from motorengine import *
+
+            class User(Document):
+                __collection__ = "UserDeletingInstance"
+                name = StringField()
+
+            io_loop = tornado.ioloop.IOLoop.instance()
+            connect("test", host="localhost", port=27017, io_loop=io_loop)
+
+        .. testcode:: saving_delete_one
+
+            def handle_user_created(user):
+                user.delete(callback=handle_user_deleted)
+
+            def handle_user_deleted(number_of_deleted_items):
+                try:
+                    assert number_of_deleted_items == 1
+                finally:
+                    io_loop.stop()
+
+            def create_user():
+                user = User(name="Bernardo")
+                user.save(callback=handle_user_created)
+
+            io_loop.add_timeout(1, create_user)
+            io_loop.start()
+        '''
+        self.objects.remove(instance=self, callback=callback, alias=alias)
+
+    @return_future
+    def load_references(self, fields=None, callback=None, alias=None):
+        if callback is None:
+            raise ValueError("Callback can't be None")
+
+        dereference = self.find_references(document=self, fields=fields, dereference=Dereference(alias=alias))
+
+        if not len(dereference):
+            callback({
+                'loaded_reference_count': 0,
+                'loaded_values': []
+            })
+            return
+
+        dereference.load(callback=self.handle_load_references(callback))
+
+    def handle_load_references(self, callback):
+        def handle(reference_count):
+            callback({
+                'loaded_reference_count': reference_count,
+                'loaded_values': self._values
+            })
+
+        return handle
+
+    def get_deferred_fields(self):
+        '''
+        Returns the names of the fields of this document left out by `QuerySet.defer`
+        that were not loaded yet.
+        '''
+        deferred = getattr(self, '_deferred', None)
+        if deferred is None:
+            return set()
+
+        return set(name for name in deferred.fields if deferred.is_deferred(self, name))
+
+    @return_future
+    def load_deferred(self, callback=None, alias=None):
+        '''
+        Loads the fields left out by `QuerySet.defer` of this document and of all the
+        documents loaded along with it, in a single query. Resolves to this document.
+
+        Usage::
+
+            posts = yield BlogPost.objects.defer("body").find_all()
+
+            yield posts[0].load_deferred()
+            # the bodies of all the posts are loaded now
+        '''
+        deferred = getattr(self, '_deferred', None)
+        if deferred is None:
+            callback(self)
+            return
+
+        IOLoop.current().add_future(deferred.load(alias=alias), self.handle_load_deferred(callback))
+
+    def handle_load_deferred(self, callback):
+        def handle(future):
+            # raises if the deferred fields could not be loaded
+            future.result()
+            callback(self)
+
+        return handle
+
+
+class EmbeddedDocument(six.with_metaclass(DocumentMetaClass, BaseDocument)):
+    '''
+    Base class for documents that are only stored embedded in other documents, with an
+    `EmbeddedDocumentField` (or a `ListField` of them).
+
+    Embedded documents only keep their values and changes. They have no `_id`, no
+    queryset (`objects`) and no instance `__dict__`, which makes creating and loading
+    them considerably cheaper than embedding a `Document`::
+
+        class Address(EmbeddedDocument):
+            street = StringField()
+
+        class User(Document):
+            address = EmbeddedDocumentField(Address)
     '''
-    pass
+    __slots__ = ('_values', '_changed_fields')
+
+    _is_embedded = True
+
+    # references of embedded documents are loaded without projections
+    _reference_loaded_fields = {}
+
+    def __init__(self, **kw):
+        values = {}
+
+        for field_name, default, is_callable in self._default_values:
+            values[field_name] = default() if is_callable else default
+
+        # unknown keys are kept as dynamic fields of this instance only
+        values.update(kw)
+
+        object.__setattr__(self, '_values', values)
+        object.__setattr__(self, '_changed_fields', None)
+
+    @classmethod
+    def from_son(cls, dic):
+        values = cls.hydrate_values(dic)
+
+        if cls._has_custom_init:
+            document = cls(**values)
+            object.__setattr__(document, '_changed_fields', NO_CHANGES)
+            return document
+
+        for field_name, default, is_callable in cls._default_values:
+            if field_name not in values:
+                values[field_name] = default() if is_callable else default
+
+        # skips __init__, as values are already converted and defaults applied
+        document = cls.__new__(cls)
+        object.__setattr__(document, '_values', values)
+        object.__setattr__(document, '_changed_fields', NO_CHANGES)
+
+        return document
+
+    def __getstate__(self):
+        return self._values, self._changed_fields
+
+    def __setstate__(self, state):
+        values, changed_fields = state
+        object.__setattr__(self, '_values', values)
+        object.__setattr__(self, '_changed_fields', changed_fields)
@@ -12,6 +12,10 @@ class LoadReferencesRequiredError(RuntimeError):
     pass
 
 
+class LoadDeferredRequiredError(RuntimeError):
+    pass
+
+
 class PartlyLoadedDocumentError(ValueError):
     pass
 
@@ -49,3 +53,29 @@ class UniqueKeyViolationError(RuntimeError):
             message=err, error_code=groups['error_code'], error_type=groups['error_type'],
             index_name=groups['index_name'], instance_type=instance_type
         )
+
+
+class BulkInsertError(RuntimeError):
+    '''
+    Raised by `bulk_insert` when some of the documents could not be inserted. `errors`
+    holds the `index`, `document`, `code` and `message` of each failed document and
+    `inserted` the number of documents that were inserted.
+    '''
+
+    def __init__(self, errors, inserted):
+        super(BulkInsertError, self).__init__(
+            "%d of the documents could not be inserted (%d inserted). First error: %s" % (
+                len(errors), inserted, errors[0].message
+            )
+        )
+
+        self.errors = errors
+        self.inserted = inserted
+
+
+class WriteBufferFullError(RuntimeError):
+    pass
+
+
+class WriteBufferClosedError(RuntimeError):
+    pass
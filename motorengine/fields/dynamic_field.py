@@ -1,8 +1,12 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+from collections import OrderedDict
+
 from motorengine.fields.base_field import BaseField
 
+DYNAMIC_FIELD_CACHE_SIZE = 1024
+
 
 class DynamicField(BaseField):
     '''
@@ -20,3 +24,22 @@ class DynamicField(BaseField):
             }
 
         return value
+
+
+_dynamic_fields = OrderedDict()
+
+
+def get_dynamic_field(db_field):
+    '''
+    Returns a DynamicField for `db_field`. As dynamic fields hold no state other
+    than their name, instances are shared between documents and queries through
+    a cache bounded to the DYNAMIC_FIELD_CACHE_SIZE most recently created fields.
+    '''
+    field = _dynamic_fields.get(db_field)
+
+    if field is None:
+        field = _dynamic_fields[db_field] = DynamicField(db_field=db_field)
+        if len(_dynamic_fields) > DYNAMIC_FIELD_CACHE_SIZE:
+            _dynamic_fields.popitem(last=False)
+
+    return field
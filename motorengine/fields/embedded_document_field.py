@@ -5,6 +5,7 @@ import six
 
 from motorengine.utils import get_class
 from motorengine.fields.base_field import BaseField
+from motorengine.values import LazyEmbeddedDocument
 
 
 class EmbeddedDocumentField(BaseField):
@@ -15,14 +16,14 @@ class EmbeddedDocumentField(BaseField):
 
     .. testcode:: modeling_fields
 
-        class Comment(Document):
+        class Comment(EmbeddedDocument):
             text = StringField(required=True)
 
         comment = EmbeddedDocumentField(embedded_document_type=Comment)
 
     Available arguments (apart from those in `BaseField`):
 
-    * `embedded_document_type` - The type of document that this field accepts as an embedded document.
+    * `embedded_document_type` - The type of document that this field accepts as an embedded document (usually a subclass of `EmbeddedDocument`).
     '''
 
     def __init__(self, embedded_document_type=None, *args, **kw):
@@ -43,9 +44,9 @@ class EmbeddedDocumentField(BaseField):
 
     def validate(self, value):
         # avoiding circular reference
-        from motorengine import Document
+        from motorengine.document import BaseDocument
 
-        if not isinstance(self.embedded_type, type) or not issubclass(self.embedded_type, Document):
+        if not isinstance(self.embedded_type, type) or not issubclass(self.embedded_type, BaseDocument):
             raise ValueError(
                 "The field 'embedded_document_type' argument must be a subclass of Document, not '%s'." %
                 str(self.embedded_type)
@@ -54,6 +55,10 @@ class EmbeddedDocumentField(BaseField):
         if value is None:
             return True
 
+        # loaded embedded documents that were never read are not validated again
+        if isinstance(value, LazyEmbeddedDocument):
+            return True
+
         if value is not None and not isinstance(value, self.embedded_type):
             return False
 
@@ -63,6 +68,9 @@ class EmbeddedDocumentField(BaseField):
         if value is None:
             return None
 
+        if isinstance(value, LazyEmbeddedDocument):
+            return value.son
+
         base = dict()
 
         base.update(value.to_son())
@@ -74,3 +82,13 @@ class EmbeddedDocumentField(BaseField):
             return None
 
         return self.embedded_type.from_son(value)
+
+    def lazy_from_son(self, value):
+        '''
+        Converter used when loading documents: keeps the SON of the embedded document
+        until the field is first read, when `from_son` creates the embedded document.
+        '''
+        if value is None:
+            return None
+
+        return LazyEmbeddedDocument(value)
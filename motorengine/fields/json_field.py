@@ -5,6 +5,44 @@ from motorengine.fields.base_field import BaseField
 from motorengine.utils import serialize, deserialize
 
 
+class JsonValue(object):
+    '''
+    Mixin of the dicts and lists loaded by `JsonField`, which keep the JSON they were
+    loaded from (or last saved as), so saving a loaded document only sends them to
+    MongoDB if they were modified (even if nested values were changed in place).
+    '''
+
+    __slots__ = ()
+
+    def has_changed(self):
+        return serialize(self) != self.son
+
+    def clear_changes(self):
+        self.son = serialize(self)
+
+
+class JsonDict(JsonValue, dict):
+    __slots__ = ('son', )
+
+    def __init__(self, value, son):
+        super(JsonDict, self).__init__(value)
+        self.son = son
+
+    def __reduce_ex__(self, protocol):
+        return (JsonDict, (dict(self), self.son))
+
+
+class JsonList(JsonValue, list):
+    __slots__ = ('son', )
+
+    def __init__(self, value, son):
+        super(JsonList, self).__init__(value)
+        self.son = son
+
+    def __reduce_ex__(self, protocol):
+        return (JsonList, (list(self), self.son))
+
+
 class JsonField(BaseField):
     '''
     Field responsible for storing json objects.
@@ -34,4 +72,11 @@ class JsonField(BaseField):
         return serialize(value)
 
     def from_son(self, value):
-        return deserialize(value)
+        result = deserialize(value)
+
+        if isinstance(result, dict):
+            return JsonDict(result, value)
+        if isinstance(result, list):
+            return JsonList(result, value)
+
+        return result
@@ -1,7 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import six
+
 from motorengine.fields.base_field import BaseField
+from motorengine.tracking import TrackedList
+from motorengine.values import LazyList
 
 
 class ListField(BaseField):
@@ -31,13 +35,22 @@ class ListField(BaseField):
 
         self._base_field = base_field
 
+        # items are only converted when first read if the base field converts them
+        item_from_son = six.get_unbound_function(type(base_field).from_son)
+        if item_from_son is six.get_unbound_function(BaseField.from_son):
+            self._item_from_son = None
+        else:
+            self._item_from_son = base_field.from_son
+
     def validate(self, value):
         if value is None:
             if self.required:
                 return False
             return True
 
-        for item in value:
+        # items of loaded lists that were never read are not validated again
+        items = value.loaded_items() if isinstance(value, TrackedList) else value
+        for item in items:
             if not self._base_field.validate(item):
                 return False
 
@@ -48,6 +61,13 @@ class ListField(BaseField):
 
     # TODO: use multiprocessing map if available
     def to_son(self, value):
+        if isinstance(value, LazyList) and value.loaded is not None:
+            to_son = self._base_field.to_son
+            return [
+                to_son(item) if is_loaded else item
+                for item, is_loaded in zip(list.__iter__(value), value.loaded)
+            ]
+
         return list(map(self._base_field.to_son, value))
 
     def to_query(self, value):
@@ -60,8 +80,10 @@ class ListField(BaseField):
 
     def from_son(self, value):
         if value is None:
-            return list()
-        return list(map(self._base_field.from_son, value))
+            return TrackedList()
+        if self._item_from_son is None:
+            return TrackedList(value)
+        return LazyList(value, converter=self._item_from_son)
 
     @property
     def item_type(self):
@@ -67,6 +67,3 @@ class ReferenceField(BaseField):
             return value
 
         return value._id
-
-    def from_son(self, value):
-        return value
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import six
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from tornado.concurrent import return_future
+from tornado.ioloop import IOLoop
+
+from motorengine.connection import DEFAULT_CONNECTION_NAME
+
+# index options that are compared with the existing indexes to decide if an index changed
+COMPARED_INDEX_OPTIONS = ('unique', 'sparse', 'expireAfterSeconds', 'partialFilterExpression')
+
+
+def get_index_key(document_class, field_spec):
+    '''
+    Returns the (db field, direction) pair for a field in an index declaration, either
+    a field name optionally prefixed with "-" (descending) or "+" (ascending), or a
+    (field name, direction) tuple for other index types (i.e.: `('location', '2dsphere')`).
+    '''
+    if isinstance(field_spec, (tuple, list)):
+        field_name, direction = field_spec
+    elif field_spec.startswith('-'):
+        field_name, direction = field_spec[1:], DESCENDING
+    else:
+        field_name, direction = field_spec.lstrip('+'), ASCENDING
+
+    if field_name == '_id':
+        return (field_name, direction)
+
+    if field_name.split('.')[0] not in document_class._fields:
+        raise ValueError("Invalid index field '%s': Field not found in '%s'." % (
+            field_name, document_class.__name__
+        ))
+
+    fields = document_class.get_fields(field_name)
+    return (".".join([field.db_field for field in fields]), direction)
+
+
+def get_index_models(document_class):
+    '''
+    Returns the pymongo IndexModels for the indexes of the document class: one per field
+    declared with `unique` or `sparse`, plus the ones declared in `__indexes__`.
+
+    Each item of `__indexes__` is either a field, a tuple of fields (for compound
+    indexes) or a dict with the fields in the "fields" key and any index options
+    (`unique`, `sparse`, `expireAfterSeconds`, `partialFilterExpression`, `background`,
+    `name` and the likes)::
+
+        class Event(Document):
+            __indexes__ = [
+                ('user', '-created_at'),
+                {'fields': 'created_at', 'expireAfterSeconds': 3600},
+                {'fields': ['kind'], 'partialFilterExpression': {'kind': {'$exists': True}}},
+            ]
+    '''
+    models = []
+
+    for field_name in document_class._fields_ordered:
+        field = document_class._fields[field_name]
+        if field.unique or field.sparse:
+            models.append(IndexModel(
+                [(field.db_field, ASCENDING)], unique=field.unique, sparse=field.sparse
+            ))
+
+    for index in getattr(document_class, '__indexes__', None) or []:
+        options = {}
+        if isinstance(index, dict):
+            options = dict(index)
+            index = options.pop('fields')
+
+        if isinstance(index, six.string_types):
+            index = [index]
+
+        models.append(IndexModel(
+            [get_index_key(document_class, field_spec) for field_spec in index], **options
+        ))
+
+    return models
+
+
+def get_index_option(index, option):
+    value = index.get(option)
+
+    # unique and sparse are not reported by the server when false
+    if option in ('unique', 'sparse'):
+        return bool(value)
+
+    return value
+
+
+def get_missing_index_models(index_models, index_information):
+    '''
+    Returns the index models that do not exist (with the same keys and options)
+    in the collection, given the collection's `index_information()`.
+    '''
+    missing = []
+
+    for model in index_models:
+        document = model.document
+        existing = index_information.get(document['name'])
+
+        if existing is not None and \
+                [tuple(key) for key in existing['key']] == list(document['key'].items()) and \
+                all(get_index_option(existing, option) == get_index_option(document, option)
+                    for option in COMPARED_INDEX_OPTIONS):
+            continue
+
+        missing.append(model)
+
+    return missing
+
+
+def get_index_changes(index_models, index_information):
+    '''
+    Returns what has to be done for the collection's indexes to match the index models,
+    given the collection's `index_information()`, as a tuple of:
+
+    * the `collMod` index specs for the existing TTL indexes whose `expireAfterSeconds`
+      changed (and nothing else);
+    * the names of the existing indexes that changed otherwise, which have to be dropped
+      before being created again (MongoDB refuses to create an index with the same name
+      and different options);
+    * the index models to create.
+    '''
+    updates = []
+    drops = []
+    creates = []
+
+    for model in get_missing_index_models(index_models, index_information):
+        document = model.document
+        existing = index_information.get(document['name'])
+
+        if existing is None:
+            creates.append(model)
+            continue
+
+        if 'expireAfterSeconds' in existing and 'expireAfterSeconds' in document and \
+                [tuple(key) for key in existing['key']] == list(document['key'].items()) and \
+                all(get_index_option(existing, option) == get_index_option(document, option)
+                    for option in COMPARED_INDEX_OPTIONS if option != 'expireAfterSeconds'):
+            updates.append({'keyPattern': document['key'], 'expireAfterSeconds': document['expireAfterSeconds']})
+            continue
+
+        drops.append(document['name'])
+        creates.append(model)
+
+    return updates, drops, creates
+
+
+class IndexRegistry(object):
+    '''
+    Keeps track of the indexes already created for each document class and connection
+    alias, so indexes are created once per process instead of before every write.
+
+    Writes that happen while the indexes of their document class are still being
+    created wait for them to be ready.
+    '''
+
+    def __init__(self):
+        self.syncs = {}
+
+    def get_key(self, document_class, alias=None):
+        if alias is None:
+            alias = document_class.__alias__ or DEFAULT_CONNECTION_NAME
+
+        return (document_class, alias)
+
+    def sync(self, queryset, alias=None, force=False):
+        '''
+        Returns a future that resolves when the indexes of the queryset's document class
+        are created, only creating them if they were not created in this process yet
+        (or if the previous attempt failed or `force` is True).
+        '''
+        key = self.get_key(queryset.__klass__, alias)
+        future = self.syncs.get(key)
+
+        if future is None or force or (future.done() and future.exception() is not None):
+            future = self.syncs[key] = queryset.ensure_index(alias=alias)
+
+        return future
+
+    def clear(self, alias=None):
+        '''
+        Forgets the indexes created for the given alias (or for all aliases), so they are
+        created again before the next write.
+        '''
+        if alias is None:
+            self.syncs.clear()
+            return
+
+        for key in list(self.syncs):
+            if key[1] == alias:
+                del self.syncs[key]
+
+
+index_registry = IndexRegistry()
+
+
+def handle_sync_indexes(callback, futures, synced):
+    def handle(future):
+        synced.append(future)
+
+        if len(synced) < len(futures):
+            return
+
+        callback(sum(future.result() for future in futures))
+
+    return handle
+
+
+@return_future
+def sync_indexes(document_classes, callback=None, alias=None):
+    '''
+    Creates the indexes of all the given document classes, even if they were already
+    created in this process. Useful in deploy scripts, so that the first writes of the
+    application do not need to wait for index creation.
+
+    Resolves to the number of indexes created.
+
+    Usage::
+
+        from motorengine import sync_indexes
+
+        yield sync_indexes([User, Post])
+    '''
+    futures = [
+        index_registry.sync(document_class.objects, alias=alias, force=True)
+        for document_class in document_classes
+    ]
+
+    if not futures:
+        callback(0)
+        return
+
+    synced = []
+    io_loop = IOLoop.current()
+    for future in futures:
+        io_loop.add_future(future, handle_sync_indexes(callback, futures, synced))
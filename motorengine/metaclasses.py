@@ -3,9 +3,286 @@
 
 # code adapted from https://github.com/MongoEngine/mongoengine/blob/master/mongoengine/base/metaclasses.py
 
-from motorengine.fields import BaseField
-from motorengine.errors import InvalidDocumentError
+import six
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:  # python 2
+    from collections import MutableMapping
+
+from motorengine.fields import BaseField, ReferenceField, EmbeddedDocumentField, ListField, JsonField
+from motorengine.errors import InvalidDocumentError, LoadReferencesRequiredError, LoadDeferredRequiredError
+from motorengine.deferred import DeferredFields
 from motorengine.queryset import QuerySet
+from motorengine.values import LazyEmbeddedDocument
+
+
+def get_field_converter(field, method_name):
+    '''
+    Returns the bound `method_name` converter of the field or None if the field
+    does not override the (identity) implementation in BaseField.
+    '''
+    method = six.get_unbound_function(getattr(type(field), method_name))
+    if method is six.get_unbound_function(getattr(BaseField, method_name)):
+        return None
+
+    return getattr(field, method_name)
+
+
+def get_hydration_converter(field):
+    '''
+    Returns the converter used to hydrate the values of the field when loading
+    documents, preferring the one that defers the conversion until the value is read.
+    '''
+    lazy_from_son = getattr(field, 'lazy_from_son', None)
+    if lazy_from_son is not None:
+        return lazy_from_son
+
+    return get_field_converter(field, 'from_son')
+
+
+def get_default_value(field):
+    '''
+    Returns the (default, is_callable) pair of the field. Defaults of fields whose values
+    are tracked (lists and json) go through `to_son` and `from_son`, so they are tracked
+    like loaded values instead of being considered changed.
+    '''
+    default = field.default
+
+    if not isinstance(field, (ListField, JsonField)) or default is None:
+        return default, callable(default)
+
+    if callable(default):
+        return (lambda: field.from_son(field.to_son(default()))), True
+
+    return (lambda: field.from_son(field.to_son(default))), True
+
+
+class FieldDescriptor(object):
+    '''
+    Data descriptor generated for each declared field of a document, so that reading
+    fields does not require overriding `__getattribute__` for every attribute.
+    '''
+
+    def __init__(self, field):
+        self.field = field
+        self.name = field.name
+        self.get_value = get_field_converter(field, 'get_value')
+
+        # member descriptor of the slot holding the value in compact documents
+        self.slot = None
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self.field
+
+        if self.slot is None:
+            value = instance._values.get(self.name, None)
+        else:
+            try:
+                value = self.slot.__get__(instance, owner)
+            except AttributeError:
+                value = None
+
+        if value is None:
+            deferred = getattr(instance, '_deferred', None)
+            if deferred is not None and deferred.is_deferred(instance, self.name):
+                message = "The property '%s' was deferred and can't be accessed before calling" + \
+                    " 'load_deferred' on its instance first (%s)."
+
+                raise LoadDeferredRequiredError(message % (self.name, owner.__name__))
+
+        if self.get_value is not None:
+            return self.get_value(value)
+
+        return value
+
+    def __set__(self, instance, value):
+        if self.slot is None:
+            instance._values[self.name] = value
+        else:
+            self.slot.__set__(instance, value)
+
+
+class ReferenceFieldDescriptor(FieldDescriptor):
+    def __get__(self, instance, owner):
+        value = super(ReferenceFieldDescriptor, self).__get__(instance, owner)
+
+        if instance is not None and value is not None and not isinstance(value, self.field.reference_type):
+            message = "The property '%s' can't be accessed before calling 'load_references'" + \
+                " on its instance first (%s) or setting __lazy__ to False in the %s class."
+
+            raise LoadReferencesRequiredError(
+                message % (self.name, owner.__name__, owner.__name__)
+            )
+
+        return value
+
+
+class EmbeddedDocumentFieldDescriptor(FieldDescriptor):
+    def __get__(self, instance, owner):
+        value = super(EmbeddedDocumentFieldDescriptor, self).__get__(instance, owner)
+
+        if isinstance(value, LazyEmbeddedDocument):
+            value = self.field.from_son(value.son)
+            # hydrating the embedded document does not change the document
+            self.__set__(instance, value)
+
+        return value
+
+
+# instance state stored in slots by compact documents (besides the field values)
+COMPACT_STATE_SLOTS = (
+    '_id', 'is_partly_loaded', '_reference_loaded_fields', '_changed_fields', '_dynamic_values', '_deferred'
+)
+
+
+def get_field_descriptor(field):
+    if isinstance(field, ReferenceField):
+        return ReferenceFieldDescriptor(field)
+
+    if isinstance(field, EmbeddedDocumentField):
+        return EmbeddedDocumentFieldDescriptor(field)
+
+    return FieldDescriptor(field)
+
+
+class CompactValues(MutableMapping):
+    '''
+    Mapping view over the slots of a compact document, so code that reads or
+    writes `document._values` works the same for compact and regular documents.
+
+    Declared fields live in slots (an unset slot means the field has no value) and
+    dynamic fields in an overflow dict that is only allocated when first needed.
+    '''
+
+    __slots__ = ('document', )
+
+    def __init__(self, document):
+        self.document = document
+
+    def __getitem__(self, name):
+        document = self.document
+        slot = document._slot_members.get(name)
+
+        if slot is None:
+            dynamic_values = document._dynamic_values
+            if dynamic_values is None:
+                raise KeyError(name)
+            return dynamic_values[name]
+
+        try:
+            return slot.__get__(document, type(document))
+        except AttributeError:
+            raise KeyError(name)
+
+    def __setitem__(self, name, value):
+        document = self.document
+        slot = document._slot_members.get(name)
+
+        if slot is not None:
+            slot.__set__(document, value)
+            return
+
+        if document._dynamic_values is None:
+            object.__setattr__(document, '_dynamic_values', {})
+        document._dynamic_values[name] = value
+
+    def __delitem__(self, name):
+        document = self.document
+        slot = document._slot_members.get(name)
+
+        if slot is None:
+            if document._dynamic_values is None:
+                raise KeyError(name)
+            del document._dynamic_values[name]
+            return
+
+        try:
+            slot.__delete__(document)
+        except AttributeError:
+            raise KeyError(name)
+
+    def __iter__(self):
+        document = self.document
+        for name, slot in document._slot_members.items():
+            try:
+                slot.__get__(document, type(document))
+            except AttributeError:
+                continue
+            yield name
+
+        if document._dynamic_values is not None:
+            for name in list(document._dynamic_values):
+                yield name
+
+    def __len__(self):
+        return sum(1 for name in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class CompactValuesDescriptor(object):
+    '''
+    Descriptor installed as `_values` in compact documents. Reading it returns a
+    `CompactValues` view and assigning a dict to it stores the values in the slots.
+    '''
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        return CompactValues(instance)
+
+    def __set__(self, instance, values):
+        slot_members = instance._slot_members
+        dynamic_values = None
+
+        for name, slot in slot_members.items():
+            if name not in values:
+                try:
+                    slot.__delete__(instance)
+                except AttributeError:
+                    pass
+
+        for name, value in values.items():
+            slot = slot_members.get(name)
+            if slot is not None:
+                slot.__set__(instance, value)
+                continue
+
+            if dynamic_values is None:
+                dynamic_values = {}
+            dynamic_values[name] = value
+
+        object.__setattr__(instance, '_dynamic_values', dynamic_values)
+
+
+def get_compact_state(document):
+    attributes = dict(
+        (name, getattr(document, name)) for name in COMPACT_STATE_SLOTS
+        if name not in ('_dynamic_values', '_deferred')
+    )
+
+    # deferred values were removed from the document, so the fields still pending are
+    # kept to be loaded with load_deferred after unpickling
+    deferred = getattr(document, '_deferred', None)
+    if deferred is not None:
+        attributes['_deferred'] = [name for name in deferred.fields if deferred.is_deferred(document, name)]
+
+    return attributes, dict(document._values)
+
+
+def set_compact_state(document, state):
+    attributes, values = state
+    for name, value in attributes.items():
+        if name != '_deferred':
+            object.__setattr__(document, name, value)
+    object.__setattr__(document, '_values', values)
+
+    if attributes.get('_deferred'):
+        DeferredFields(type(document), attributes['_deferred']).add(document)
 
 
 class classproperty(property):
@@ -39,6 +316,7 @@ class DocumentMetaClass(type):
             if not attr_value.db_field:
                 attr_value.db_field = attr_name
             doc_fields[attr_name] = attr_value
+            attrs[attr_name] = get_field_descriptor(attr_value)
 
             # Count names to ensure no db_field redefinitions
             field_names[attr_value.db_field] = field_names.get(
@@ -61,8 +339,72 @@ class DocumentMetaClass(type):
         attrs['_reverse_db_field_map'] = dict(
             (v, k) for k, v in attrs['_db_field_map'].items())
 
+        # Compile the plan used by from_son to hydrate instances:
+        # db_field -> (field name, from_son converter or None for identity)
+        attrs['_hydration_plan'] = dict(
+            (v.db_field, (k, get_hydration_converter(v)))
+            for k, v in doc_fields.items())
+        attrs['_default_values'] = tuple(
+            (k, ) + get_default_value(v) for k, v in doc_fields.items())
+        attrs['_has_custom_init'] = '__init__' in attrs or any(
+            getattr(base, '_has_custom_init', False) for base in bases)
+
+        # Compile the plan used by to_son and validate_fields:
+        # (name, db_field, get_value, to_son, sparse, is_empty, validate)
+        # where converters and validators that are no-ops are None
+        attrs['_serialization_plan'] = tuple(
+            (k, v.db_field, get_field_converter(v, 'get_value'),
+             get_field_converter(v, 'to_son'), v.sparse,
+             v.is_empty if v.required else None,
+             get_field_converter(v, 'validate'))
+            for k, v in doc_fields.items())
+        attrs['_serialization_plan_map'] = dict(
+            (plan[0], plan) for plan in attrs['_serialization_plan'])
+        # fields whose documents are saved on their own, so their changes do not
+        # make the referencing document dirty
+        attrs['_reference_fields'] = frozenset(
+            k for k, v in doc_fields.items()
+            if isinstance(v, ReferenceField) or isinstance(getattr(v, '_base_field', None), ReferenceField))
+        attrs['_on_save_fields'] = tuple(
+            (k, v) for k, v in doc_fields.items() if v.on_save is not None)
+        attrs['_has_custom_validate'] = any(
+            name in attrs for name in ('validate', 'validate_fields')) or any(
+            getattr(base, '_has_custom_validate', False) for base in bases)
+
+        # embedded documents have no queryset and already keep their values in slots
+        is_embedded = attrs.get('_is_embedded', any(
+            getattr(base, '_is_embedded', False) for base in bases))
+        if is_embedded and '__slots__' not in attrs:
+            attrs['__slots__'] = ()
+
+        is_compact = not is_embedded and attrs.get('__compact__', any(
+            getattr(base, '__compact__', False) for base in bases))
+        if is_compact:
+            new_slots = cls._add_compact_slots(flattened_bases, attrs, doc_fields)
+
         new_class = super_new(cls, name, bases, attrs)
 
+        if is_compact:
+            slot_members = {}
+            for base in flattened_bases[::-1]:
+                slot_members.update(getattr(base, '_slot_members', {}))
+            for field_name, slot_name in new_slots:
+                slot_members[field_name] = new_class.__dict__[slot_name]
+                attrs[field_name].slot = slot_members[field_name]
+            new_class._slot_members = slot_members
+
+        if '__compact__' not in attrs:
+            new_class.__compact__ = is_compact
+
+        # compact documents and documents with a custom __init__ can't use the decoded
+        # SON as their values
+        decode_values = attrs.get('__decode_values__', any(
+            getattr(base, '__decode_values__', False) for base in bases))
+        new_class._decodes_values = bool(decode_values) and not is_compact and not new_class._has_custom_init
+
+        if is_embedded:
+            return new_class
+
         if '__collection__' not in attrs:
             new_class.__collection__ = new_class.__name__
 
@@ -76,6 +418,43 @@ class DocumentMetaClass(type):
 
         return new_class
 
+    @classmethod
+    def _add_compact_slots(cls, flattened_bases, attrs, doc_fields):
+        '''
+        Declares the `__slots__` of a compact document class: one slot per declared
+        field that does not have one in a base class yet, plus the instance state
+        slots in the first compact class of the hierarchy. Returns the new
+        (field name, slot name) pairs.
+        '''
+        slotted_fields = set()
+        has_compact_base = False
+        for base in flattened_bases:
+            if getattr(base, '__compact__', False):
+                has_compact_base = True
+                slotted_fields.update(base._slot_members)
+
+        slots = []
+        if not has_compact_base:
+            slots.extend(COMPACT_STATE_SLOTS)
+            attrs['_values'] = CompactValuesDescriptor()
+            attrs['__getstate__'] = get_compact_state
+            attrs['__setstate__'] = set_compact_state
+
+        new_slots = []
+        for field_name, field in doc_fields.items():
+            if field_name in slotted_fields or field.__class__.__name__ == 'DynamicField':
+                continue
+
+            if field_name not in attrs:
+                # inherited from a regular document class
+                attrs[field_name] = get_field_descriptor(field)
+
+            new_slots.append((field_name, 'slot__%s' % field_name))
+
+        attrs['__slots__'] = tuple(slots + [slot_name for field_name, slot_name in new_slots])
+
+        return new_slots
+
     @classmethod
     def _get_bases(cls, bases):
         if isinstance(bases, BasesTuple):
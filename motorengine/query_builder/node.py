@@ -1,8 +1,6 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import copy
-
 # Adapted from https://github.com/MongoEngine/mongoengine/blob/master/mongoengine/queryset/visitor.py
 
 from motorengine.query_builder.transform import transform_query
@@ -58,7 +56,8 @@ class SimplificationVisitor(QNodeVisitor):
                 raise DuplicateQueryConditionsError()
 
             query_ops.update(ops)
-            combined_query.update(copy.deepcopy(query))
+            # transform_query never changes the query values, so they can be shared
+            combined_query.update(query)
         return combined_query
 
 
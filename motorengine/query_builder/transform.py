@@ -3,6 +3,7 @@
 
 import collections
 
+from motorengine.fields.dynamic_field import DynamicField
 from motorengine.query.base import QueryOperator
 from motorengine.query.exists import ExistsQueryOperator
 from motorengine.query.greater_than import GreaterThanQueryOperator
@@ -63,36 +64,98 @@ def update(d, u):
     return d
 
 
-def transform_query(document, **query):
-    mongo_query = {}
+class QueryTemplateCache(object):
+    '''
+    Cache of compiled query templates, keyed by document class and the set of filter keys.
+
+    A template holds, for each filter key (in sorted order), the resolved database field
+    name, the field used to convert the filter value and the query operator, so filters
+    with an already seen shape only need to have their values converted.
+
+    The `hits` and `misses` counters can be used to tune `max_size`.
+    '''
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.templates = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_template(self, document, query):
+        key = (document, frozenset(query))
+        template = self.templates.get(key)
+
+        if template is not None:
+            self.hits += 1
+            return template
+
+        self.misses += 1
+        template = compile_query_template(document, sorted(query))
+        self.templates[key] = template
+
+        if len(self.templates) > self.max_size:
+            self.templates.popitem(last=False)
+
+        return template
+
+    def clear(self):
+        self.templates.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.templates),
+        }
+
+
+query_cache = QueryTemplateCache()
+
+
+def compile_query_template(document, keys):
+    template = []
 
-    for key, value in sorted(query.items()):
+    for key in keys:
         if key == 'raw':
-            update(mongo_query, value)
+            template.append((key, None, None, None))
             continue
 
         if '__' not in key:
             field = document.get_fields(key)[0]
-            field_name = field.db_field
-            operator = DefaultOperator()
-            field_value = operator.get_value(field, value)
-        else:
-            values = key.split('__')
-            field_reference_name, operator = ".".join(values[:-1]), values[-1]
-            if operator not in OPERATORS:
-                field_reference_name = "%s.%s" % (field_reference_name, operator)
-                operator = ""
+            template.append((key, field.db_field, field, DefaultOperator()))
+            continue
 
-            fields = document.get_fields(field_reference_name)
+        values = key.split('__')
+        field_reference_name, operator = ".".join(values[:-1]), values[-1]
+        if operator not in OPERATORS:
+            field_reference_name = "%s.%s" % (field_reference_name, operator)
+            operator = ""
 
-            field_name = ".".join([
-                hasattr(field, 'db_field') and field.db_field or field
-                for field in fields
-            ])
-            operator = OPERATORS.get(operator, DefaultOperator)()
-            field_value = operator.get_value(fields[-1], value)
+        fields = document.get_fields(field_reference_name)
 
-        update(mongo_query, operator.to_query(field_name, field_value))
+        field_name = ".".join([
+            hasattr(field, 'db_field') and field.db_field or field
+            for field in fields
+        ])
+        template.append((key, field_name, fields[-1], OPERATORS.get(operator, DefaultOperator)()))
+
+    return tuple(template)
+
+
+def transform_query(document, **query):
+    mongo_query = {}
+
+    for key, field_name, field, operator in query_cache.get_template(document, query):
+        value = query[key]
+
+        if operator is None:
+            update(mongo_query, value)
+            continue
+
+        update(mongo_query, operator.to_query(field_name, operator.get_value(field, value)))
 
     return mongo_query
 
@@ -138,3 +201,123 @@ def transform_field_list_query(document, query_field_list):
             fields[field_db_name] = query_field_list[key]
 
     return fields
+
+
+UPDATE_OPERATORS = {
+    'set': '$set',
+    'unset': '$unset',
+    'inc': '$inc',
+    'dec': '$inc',
+    'mul': '$mul',
+    'min': '$min',
+    'max': '$max',
+    'push': '$push',
+    'push_all': '$push',
+    'add_to_set': '$addToSet',
+    'pull': '$pull',
+    'pull_all': '$pullAll',
+    'pop': '$pop',
+}
+
+# update operators whose value is an item of the list field being updated
+LIST_ITEM_UPDATE_OPERATORS = ('push', 'push_all', 'add_to_set', 'pull', 'pull_all')
+
+# positional operator ("items__S__quantity" updates the matched item of "items")
+POSITIONAL_OPERATOR = 'S'
+
+
+def get_update_field_path(document, key, path):
+    '''
+    Returns the database path, the resolved fields and the position of each field in the
+    database path for the field path of an update, keeping positional operators and list
+    indexes in the database path.
+    '''
+    names = [name for name in path if name != POSITIONAL_OPERATOR and not name.isdigit()]
+    if not names:
+        raise ValueError("Invalid update '%s': Field not specified." % key)
+
+    fields = document.get_fields(".".join(names))
+
+    # unknown names resolve to dynamic fields, which updates do not create (like filters)
+    if len(fields) != len(names) or not all(fields) or \
+            any(isinstance(field, (DynamicField, )) for field in fields):
+        raise ValueError("Invalid update '%s': Field not found in '%s'." % (key, document.__name__))
+
+    db_path = []
+    positions = []
+    for name in path:
+        if name == POSITIONAL_OPERATOR:
+            db_path.append('$')
+        elif name.isdigit():
+            db_path.append(name)
+        else:
+            field = fields[len(positions)]
+            positions.append(len(db_path))
+            db_path.append(field.db_field if field is not None else name)
+
+    return db_path, fields, positions
+
+
+def get_update_value(field, value, is_list_item):
+    from motorengine.fields.list_field import ListField
+
+    if field is None or value is None:
+        return value
+
+    if is_list_item and isinstance(field, (ListField, )):
+        field = field._base_field
+
+    if isinstance(value, (list, tuple)) and is_list_item:
+        return [field.to_son(item) for item in value]
+
+    return field.to_son(value)
+
+
+def transform_update(document, **update):
+    '''
+    Transforms MongoEngine-style update keyword arguments (`inc__views=1`,
+    `push__tags="x"`, `set__items__S__quantity=2`) into a MongoDB update document,
+    resolving field names to their database names the same way queries do.
+
+    Keys without an update operator are set (`name="x"` is the same as `set__name="x"`).
+    '''
+    from motorengine.fields.list_field import ListField
+
+    mongo_update = {}
+
+    for key, value in sorted(update.items()):
+        path = key.split('__')
+        operator = 'set'
+        if path[0] in UPDATE_OPERATORS:
+            operator = path.pop(0)
+
+        db_path, fields, positions = get_update_field_path(document, key, path)
+        field = fields[-1]
+
+        list_indexes = [
+            index for index, list_field in enumerate(fields[:-1]) if isinstance(list_field, (ListField, ))
+        ]
+
+        if operator in ('inc', 'dec', 'mul'):
+            if operator == 'dec':
+                value = -value
+        elif operator == 'unset':
+            value = ""
+        elif operator == 'pop':
+            value = int(value)
+        elif operator == 'pull' and list_indexes:
+            # pull__comments__author="x" removes the items of comments whose author is "x"
+            position = positions[list_indexes[-1]] + 1
+            value = {".".join(db_path[position:]): get_update_value(field, value, False)}
+            db_path = db_path[:position]
+        else:
+            is_list_item = operator in LIST_ITEM_UPDATE_OPERATORS or \
+                path[-1] == POSITIONAL_OPERATOR or path[-1].isdigit()
+            value = get_update_value(field, value, is_list_item)
+
+            if operator == 'push_all' or (operator == 'add_to_set' and isinstance(value, list)):
+                value = {'$each': value}
+
+        mongo_update.setdefault(UPDATE_OPERATORS[operator], {})[".".join(db_path)] = value
+
+    return mongo_update
@@ -2,21 +2,37 @@
 # -*- coding: utf-8 -*-
 
 import sys
+import copy
 import operator
 import itertools
 
+from pymongo import ReturnDocument
 from pymongo.errors import DuplicateKeyError
 from tornado.concurrent import return_future
+from tornado.ioloop import IOLoop
 from easydict import EasyDict as edict
+from bson import json_util
 from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
 
 from motorengine import ASCENDING
 from motorengine.aggregation.base import Aggregation
+from motorengine.buffer import write_buffers
+from motorengine.bulk import (
+    BulkOperation, BulkInsert, DEFAULT_INSERT_CHUNK_SIZE, DEFAULT_INSERT_CHUNK_BYTES
+)
 from motorengine.connection import get_connection
+from motorengine.deferred import DeferredFields
+from motorengine.dereference import Dereference
+from motorengine.indexes import index_registry, get_index_models, get_index_changes
 from motorengine.errors import (
     UniqueKeyViolationError, PartlyLoadedDocumentError
 )
 from motorengine.query_builder.field_list import QueryFieldList
+from motorengine.session import get_current_session
+from motorengine.stream import QueryStream, DEFAULT_BATCH_SIZE
+from motorengine.utils import encode_continuation_token, decode_continuation_token
+from motorengine.values import DecodedSon
 
 DEFAULT_LIMIT = 1000
 
@@ -30,12 +46,37 @@ class QuerySet(object):
         self._order_fields = []
         self._loaded_fields = QueryFieldList()
         self._reference_loaded_fields = {}
+        self._raw_mode = None
+        self._raw_fields = ()
+        self._convert_raw_values = False
+        self._deferred_fields = ()
 
     @property
     def is_lazy(self):
         return self.__klass__.__lazy__
 
-    def coll(self, alias=None):
+    @property
+    def is_raw_bson(self):
+        return self._raw_mode in ('bson', 'json')
+
+    def get_read_document_class(self):
+        '''
+        Returns the class pymongo should decode the documents read by this queryset into
+        (or None for the connection default).
+        '''
+        if self.is_raw_bson:
+            return RawBSONDocument
+
+        if self._raw_mode is None and self.__klass__._decodes_values:
+            return DecodedSon
+
+        return None
+
+    def coll(self, alias=None, document_class=None):
+        '''
+        Returns the collection of this queryset document class, decoding documents into
+        `document_class` if specified.
+        '''
         if alias is not None:
             conn = get_connection(alias=alias)
         elif self.__klass__.__alias__ is not None:
@@ -43,7 +84,12 @@ class QuerySet(object):
         else:
             conn = get_connection()
 
-        return conn[self.__klass__.__collection__]
+        coll = conn[self.__klass__.__collection__]
+
+        if document_class is not None:
+            return coll.with_options(codec_options=coll.codec_options.with_options(document_class=document_class))
+
+        return coll
 
     @return_future
     def create(self, callback, alias=None, **kwargs):
@@ -79,7 +125,7 @@ class QuerySet(object):
         document = self.__klass__(**kwargs)
         self.save(document=document, callback=callback, alias=alias)
 
-    def handle_save(self, document, callback):
+    def handle_save(self, document, callback, alias=None):
         def handle(*arguments, **kw):
             if len(arguments) > 1 and arguments[1]:
                 if isinstance(arguments[1], (DuplicateKeyError, )):
@@ -88,23 +134,40 @@ class QuerySet(object):
                     raise arguments[1]
 
             document._id = arguments[0]
+            document.clear_changes()
+            self.add_to_session(document, alias=alias)
             callback(document)
 
         return handle
 
-    def handle_update(self, document, callback):
+    def handle_update(self, document, callback, alias=None):
         def handle(*arguments, **kw):
             if len(arguments) > 1 and arguments[1]:
                 raise arguments[1]
 
+            document.clear_changes()
+            self.add_to_session(document, alias=alias)
             callback(document)
 
         return handle
 
-    def update_field_on_save_values(self, document, creating):
-        for field_name, field in self.__klass__._fields.items():
-            if field.on_save is not None:
-                setattr(document, field_name, field.on_save(document, creating))
+    def add_to_session(self, document, alias=None):
+        session = get_current_session()
+        if session is not None and not document.get_deferred_fields():
+            session.add(document, alias=alias)
+
+    def update_field_on_save_values(self, document, creating, son=None):
+        for field_name, field in self.__klass__._on_save_fields:
+            setattr(document, field_name, field.on_save(document, creating))
+
+            if son is None:
+                continue
+
+            value = document.get_field_value(field_name)
+            if field.sparse and value is None:
+                son.pop(field.db_field, None)
+            else:
+                son[field.db_field] = field.to_son(value)
 
     def save(self, document, callback, alias=None, upsert=False):
         if document.is_partly_loaded:
@@ -117,77 +180,163 @@ class QuerySet(object):
                 msg.format(document.__class__.__name__)
             )
 
-        if self.validate_document(document):
-            self.ensure_index(
-                callback=self.indexes_saved_before_save(document, callback, alias=alias, upsert=upsert), 
-                alias=alias
+        if document._id is not None and not upsert:
+            changed_fields = document.get_changed_fields()
+            if changed_fields is not None:
+                self.save_changes(document, changed_fields, callback, alias=alias)
+                return
+
+        if document.get_deferred_fields():
+            raise PartlyLoadedDocumentError(
+                "Document {0} can't be saved in full before its deferred fields are "
+                "loaded with 'load_deferred'".format(document.__class__.__name__)
             )
 
-    def indexes_saved_before_save(self, document, callback, alias=None, upsert=False):
+        doc = self.validate_and_serialize_document(document)
+        if doc is None:
+            return
+
+        if document._id is None:
+            write_buffer = write_buffers.get(self, alias=alias)
+            if write_buffer is not None:
+                self.update_field_on_save_values(document, False, son=doc)
+                IOLoop.current().add_future(write_buffer.insert(doc), self.handle_buffered_save(document, callback, alias=alias))
+                return
+
+        self.wait_for_indexes(
+            callback=self.indexes_saved_before_save(document, doc, callback, alias=alias, upsert=upsert),
+            alias=alias
+        )
+
+    def handle_buffered_save(self, document, callback, alias=None):
+        def handle(future):
+            try:
+                document._id = future.result()
+            except DuplicateKeyError:
+                err = sys.exc_info()[1]
+                raise UniqueKeyViolationError.from_pymongo(str(err), self.__klass__) or err
+
+            document.clear_changes()
+            self.add_to_session(document, alias=alias)
+            callback(document)
+
+        return handle
+
+    def save_changes(self, document, changed_fields, callback, alias=None):
+        '''
+        Saves a document that was loaded from (or already saved to) the database by
+        sending only the fields changed since then with `$set` and `$unset`.
+        '''
+        if not changed_fields:
+            callback(document)
+            return
+
+        self.check_document_type(document)
+        if not document.validate_changes(changed_fields):
+            return
+
+        self.wait_for_indexes(
+            callback=self.indexes_saved_before_save_changes(document, callback, alias=alias),
+            alias=alias
+        )
+
+    def indexes_saved_before_save_changes(self, document, callback, alias=None):
         def handle(*args, **kw):
+            # same flag full saves of documents with an _id pass to on_save
             self.update_field_on_save_values(document, document._id is not None)
-            doc = document.to_son()
+
+            self.coll(alias).update(
+                {'_id': document._id},
+                document.get_update_for_changes(document.get_changed_fields()),
+                callback=self.handle_update(document, callback, alias=alias),
+            )
+
+        return handle
+
+    def handle_indexes_synced(self, callback):
+        def handle(indexes):
+            # raises if the indexes could not be created
+            indexes.result()
+            callback()
+
+        return handle
+
+    def wait_for_indexes(self, callback, alias=None):
+        '''
+        Calls `callback` once the indexes of this document class exist. Indexes are
+        created only before the first write in this process, so after that the
+        callback is called right away.
+        '''
+        indexes = index_registry.sync(self, alias=alias)
+
+        if indexes.done():
+            self.handle_indexes_synced(callback)(indexes)
+        else:
+            IOLoop.current().add_future(indexes, self.handle_indexes_synced(callback))
+
+    def indexes_saved_before_save(self, document, doc, callback, alias=None, upsert=False):
+        def handle(*args, **kw):
+            self.update_field_on_save_values(document, document._id is not None, son=doc)
 
             if document._id is not None:
                 self.coll(alias).update(
-                    {'_id': document._id}, 
-                    doc, 
-                    callback=self.handle_update(document, callback),
+                    {'_id': document._id},
+                    doc,
+                    callback=self.handle_update(document, callback, alias=alias),
                     upsert=upsert,
                 )
             else:
-                self.coll(alias).insert(doc, callback=self.handle_save(document, callback))
+                self.coll(alias).insert(doc, callback=self.handle_save(document, callback, alias=alias))
 
         return handle
 
-    def validate_document(self, document):
+    def check_document_type(self, document):
         if not isinstance(document, self.__klass__):
             raise ValueError("This queryset for class '%s' can't save an instance of type '%s'." % (
                 self.__klass__.__name__,
                 document.__class__.__name__,
             ))
 
-        return document.validate()
-
-    def handle_bulk_insert(self, documents, callback):
-        def handle(*arguments, **kw):
-            if len(arguments) > 1 and arguments[1]:
-                raise arguments[1]
-
-            for object_index, object_id in enumerate(arguments[0]):
-                documents[object_index]._id = object_id
-            callback(documents)
+    def validate_document(self, document):
+        self.check_document_type(document)
 
-        return handle
+        return document.validate()
 
-    @return_future
-    def bulk_insert(self, documents, callback=None, alias=None):
+    def validate_and_serialize_document(self, document):
         '''
-        Inserts all documents passed to this method in one go.
+        Validates the document and returns its SON (or None if the document is not valid).
         '''
+        self.check_document_type(document)
 
-        is_valid = True
-        docs_to_insert = []
+        return document.validate_and_to_son()
 
-        for document_index, document in enumerate(documents):
-            try:
-                is_valid = is_valid and self.validate_document(document)
-            except Exception:
-                err = sys.exc_info()[1]
-                raise ValueError("Validation for document %d in the documents you are saving failed with: %s" % (
-                    document_index,
-                    str(err)
-                ))
-
-            if not is_valid:
-                return
+    @return_future
+    def bulk_insert(self, documents, callback=None, alias=None, ordered=True, chunk_size=DEFAULT_INSERT_CHUNK_SIZE,
+                    chunk_bytes=DEFAULT_INSERT_CHUNK_BYTES, concurrency=1):
+        '''
+        Inserts all documents passed to this method, in chunks of at most `chunk_size`
+        documents and `chunk_bytes` bytes.
 
-            docs_to_insert.append(document.to_son())
+        `documents` can be any iterable or an async iterator (like a `QuerySet.stream` of
+        another collection), so large imports don't need to be kept in memory. Resolves to
+        the documents when a list (or tuple) is given or to the number of inserted
+        documents otherwise.
 
-        if not is_valid:
-            return
+        When `ordered` is False, documents that fail validation or insertion don't stop
+        the insertion of the others, up to `concurrency` chunks are inserted at the same
+        time and a :py:class:`motorengine.errors.BulkInsertError` with the failed
+        documents is raised at the end::
 
-        self.coll(alias).insert(docs_to_insert, callback=self.handle_bulk_insert(documents, callback))
+            try:
+                yield User.objects.bulk_insert(users, ordered=False, concurrency=4)
+            except BulkInsertError as err:
+                for error in err.errors:
+                    print(error.index, error.message)
+        '''
+        BulkInsert(
+            self, documents, callback, ordered=ordered, chunk_size=chunk_size, chunk_bytes=chunk_bytes,
+            concurrency=concurrency, alias=alias
+        ).start()
 
     def handle_update_documents(self, callback):
         def handle(*arguments, **kwargs):
@@ -214,12 +363,49 @@ class QuerySet(object):
 
         return result
 
+    def get_update_document(self, definition=None, **kwargs):
+        from motorengine.query_builder.transform import transform_update
+
+        document = transform_update(self.__klass__, **kwargs)
+
+        if definition:
+            definition = self.transform_definition(definition)
+            if all(key.startswith('$') for key in definition):
+                for operator, fields in definition.items():
+                    document.setdefault(operator, {}).update(fields)
+            else:
+                document.setdefault('$set', {}).update(definition)
+
+        if not document:
+            raise ValueError("Update requires at least one field to update.")
+
+        return document
+
     @return_future
-    def update(self, definition, callback=None, alias=None):
+    def update(self, definition=None, callback=None, alias=None, **kwargs):
+        '''
+        Updates all the documents that match the specified filters (if any) in a single
+        operation, without loading them.
+
+        `definition` is a dict of fields (or field names) to the values they should be set
+        to. Atomic update operators are specified as keyword arguments, prefixed by the
+        operator (`set`, `unset`, `inc`, `dec`, `mul`, `min`, `max`, `push`, `push_all`,
+        `add_to_set`, `pull`, `pull_all` and `pop`), with `S` as the positional operator::
+
+            yield Post.objects.filter(title="Hello").update(inc__views=1, push__tags="news")
+            yield Post.objects.filter(comments__author="heynemann").update(
+                set__comments__S__approved=True
+            )
+
+        Keyword arguments for fields not declared in the document raise `ValueError`.
+
+        Resolves to an object with the `count` of updated documents and whether the update
+        `updated_existing` documents.
+        '''
         if callback is None:
             raise RuntimeError("The callback argument is required")
 
-        definition = self.transform_definition(definition)
+        document = self.get_update_document(definition, **kwargs)
 
         update_filters = {}
         if self._filters:
@@ -227,12 +413,68 @@ class QuerySet(object):
 
         update_arguments = dict(
             spec=update_filters,
-            document={'$set': definition},
+            document=document,
             multi=True,
             callback=self.handle_update_documents(callback)
         )
         self.coll(alias).update(**update_arguments)
 
+    def handle_modify(self, callback, alias=None):
+        def handle(*arguments, **kw):
+            if len(arguments) > 1 and arguments[1]:
+                raise arguments[1]
+
+            # the document in the session (if any) is updated with the returned values
+            self.handle_get(callback, alias=alias, merge=True)(arguments[0])
+
+        return handle
+
+    def indexes_saved_before_modify(self, query, document, callback, new=True, upsert=False, alias=None):
+        def handle(*args, **kw):
+            modify_arguments = dict(
+                projection=self.get_projection(),
+                upsert=upsert,
+                return_document=ReturnDocument.AFTER if new else ReturnDocument.BEFORE,
+                callback=self.handle_modify(callback, alias=alias)
+            )
+
+            if self._order_fields:
+                modify_arguments['sort'] = self._order_fields
+
+            self.coll(alias, document_class=self.get_read_document_class()).find_one_and_update(query, document, **modify_arguments)
+
+        return handle
+
+    @return_future
+    def modify(self, definition=None, new=True, upsert=False, callback=None, alias=None, **kwargs):
+        '''
+        Atomically updates the first document that matches the specified filters (if any)
+        and returns it, in a single operation.
+
+        The update is specified the same way as in `update`. The document is returned as
+        it is after the update, unless `new` is False (then it's returned as it was before
+        the update). Resolves to None if no document matched (and `upsert` is False).
+
+        The order of the queryset (`order_by`) decides which document is updated when many
+        match and `only`/`exclude` decide which fields are returned::
+
+            job = yield Job.objects.filter(status="pending").order_by("created_at").modify(
+                set__status="running", inc__attempts=1
+            )
+        '''
+        if callback is None:
+            raise RuntimeError("The callback argument is required")
+
+        document = self.get_update_document(definition, **kwargs)
+        query = self.get_query_from_filters(self._filters)
+
+        handle = self.indexes_saved_before_modify(query, document, callback, new=new, upsert=upsert, alias=alias)
+
+        if upsert:
+            self.wait_for_indexes(callback=handle, alias=alias)
+        else:
+            handle()
+
     @return_future
     def delete(self, callback=None, alias=None):
         '''
@@ -281,10 +523,17 @@ class QuerySet(object):
         if callback is None:
             raise RuntimeError("The callback argument is required")
 
+        session = get_current_session()
+
         if instance is not None:
             if hasattr(instance, '_id') and instance._id:
+                if session is not None:
+                    session.discard(instance, alias=alias)
                 self.coll(alias).remove(instance._id, callback=self.handle_remove(callback))
         else:
+            if session is not None:
+                session.discard_type(self.__klass__, alias=alias)
+
             if self._filters:
                 remove_filters = self.get_query_from_filters(self._filters)
                 self.coll(alias).remove(remove_filters, callback=self.handle_remove(callback))
@@ -542,6 +791,166 @@ class QuerySet(object):
 
         return self
 
+    def defer(self, *fields):
+        '''
+        Leaves the specified fields out of the loaded documents, which (unlike with
+        `exclude()`) can still be saved.
+
+        Reading a deferred field raises `LoadDeferredRequiredError` until `load_deferred`
+        is called on the document, which loads the deferred fields of all the documents
+        of the same result set with a single query::
+
+            posts = yield BlogPost.objects.defer("body").find_all()
+
+            for post in posts:
+                if post.featured:
+                    yield post.load_deferred()
+                    print(post.body)
+
+        `defer()` is chainable and will perform a union. Only declared fields of the
+        document can be deferred.
+
+        :param fields: fields to defer
+        '''
+        from motorengine.fields.base_field import BaseField
+
+        deferred_fields = list(self._deferred_fields)
+        for field_name in fields:
+            if isinstance(field_name, (BaseField, )):
+                field_name = field_name.name
+
+            if field_name not in self.__klass__._fields:
+                raise ValueError("Invalid field '%s': Field not found in '%s'." % (field_name, self.__klass__.__name__))
+
+            if field_name not in deferred_fields:
+                deferred_fields.append(field_name)
+
+        self._deferred_fields = tuple(deferred_fields)
+
+        return self
+
+    def get_projection(self):
+        '''
+        Returns the projection for the fields loaded by this queryset (see `only`,
+        `exclude` and `defer`).
+        '''
+        loaded_fields = self._loaded_fields
+
+        if self._deferred_fields:
+            loaded_fields = copy.deepcopy(loaded_fields) + QueryFieldList(
+                self._deferred_fields, value=QueryFieldList.EXCLUDE
+            )
+
+        return loaded_fields.to_query(self.__klass__)
+
+    def defer_documents(self, documents, alias=None):
+        '''
+        Marks the fields left out by `defer` in the documents of a result set.
+        '''
+        if not self._deferred_fields or self._raw_mode is not None or not documents:
+            return
+
+        deferred = DeferredFields(self.__klass__, self._deferred_fields, alias=alias)
+        for document in documents:
+            deferred.add(document)
+
+    def get_raw_field_names(self, fields):
+        from motorengine.fields.base_field import BaseField
+
+        return tuple(
+            field.name if isinstance(field, (BaseField, )) else field
+            for field in fields
+        )
+
+    def as_raw(self, convert=False):
+        '''
+        Makes `get`, `find_all` and `stream` return dicts keyed by field name instead of
+        documents, skipping the creation of documents (and the loading of references).
+
+        Values are returned as stored in MongoDB (embedded documents are dicts keyed by
+        their database field names, for instance), unless `convert` is True::
+
+            users = yield User.objects.filter(active=True).as_raw().find_all()
+            # [{'_id': ObjectId(...), 'name': 'Bernardo', 'email': 'heynemann@gmail.com'}, ...]
+        '''
+        self._raw_mode = 'dict'
+        self._raw_fields = ()
+        self._convert_raw_values = convert
+
+        return self
+
+    def values(self, *fields, **kwargs):
+        '''
+        Same as `as_raw`, but only loads and returns the specified fields::
+
+            users = yield User.objects.values("name", "email").find_all()
+            # [{'name': 'Bernardo', 'email': 'heynemann@gmail.com'}, ...]
+        '''
+        self.as_raw(convert=kwargs.get('convert', False))
+        self._raw_fields = self.get_raw_field_names(fields)
+
+        if fields:
+            self.only(*fields)
+
+        return self
+
+    def values_list(self, *fields, **kwargs):
+        '''
+        Same as `values`, but returns tuples with the values of the specified fields (or
+        the `_id` and all fields if none is specified), in order. With `flat=True` and a
+        single field, returns the values themselves::
+
+            names = yield User.objects.values_list("name", flat=True).find_all()
+            # ['Bernardo', 'Heynemann']
+        '''
+        flat = kwargs.get('flat', False)
+        if flat and len(fields) != 1:
+            raise ValueError("values_list with flat=True requires exactly one field.")
+
+        self.values(*fields, convert=kwargs.get('convert', False))
+        self._raw_mode = 'flat' if flat else 'list'
+
+        if not fields:
+            self._raw_fields = ('_id', ) + self.__klass__._fields_ordered
+
+        return self
+
+    def as_raw_bson(self, to_json=False):
+        '''
+        Makes `get`, `find_all` and `stream` return the documents as `RawBSONDocument`
+        instances, that keep the BSON returned by MongoDB without decoding it (available
+        in their `raw` attribute), or as extended JSON strings if `to_json` is True.
+        Useful for endpoints that only relay the documents::
+
+            documents = yield User.objects.filter(active=True).as_raw_bson().find_all()
+            self.write(b"".join(document.raw for document in documents))
+        '''
+        self._raw_mode = 'json' if to_json else 'bson'
+        self._raw_fields = ()
+        self._convert_raw_values = False
+
+        return self
+
+    def get_raw_value_from_son(self, son):
+        if self._raw_mode == 'bson':
+            return son
+
+        if self._raw_mode == 'json':
+            return json_util.dumps(son)
+
+        values = self.__klass__.get_values_from_son(son, convert=self._convert_raw_values)
+
+        if self._raw_mode == 'dict':
+            if not self._raw_fields:
+                return values
+
+            return dict((name, values.get(name)) for name in self._raw_fields)
+
+        if self._raw_mode == 'flat':
+            return values.get(self._raw_fields[0])
+
+        return tuple(values.get(name) for name in self._raw_fields)
+
     def handle_auto_load_references(self, doc, callback):
         def handle(*args, **kw):
             if len(args) > 0:
@@ -552,29 +961,26 @@ class QuerySet(object):
 
         return handle
 
-    def handle_get(self, callback):
+    def handle_get(self, callback, alias=None, merge=False):
         def handle(*args, **kw):
             instance = args[0]
 
             if instance is None:
                 callback(None)
+            elif self._raw_mode is not None:
+                callback(self.get_raw_value_from_son(instance))
             else:
-                doc = self.__klass__.from_son(
-                    instance,
-                    # if _loaded_fields is not empty then
-                    # document is partly loaded
-                    _is_partly_loaded=bool(self._loaded_fields),
-                    # set projections for references (if any)
-                    _reference_loaded_fields=self._reference_loaded_fields
-                )
-
-                if self.is_lazy:
-                    callback(doc)
-                else:
-                    doc.load_references(callback=self.handle_auto_load_references(doc, callback))
+                doc = self.get_documents_from_son([instance], alias=alias, merge=merge)[0]
+                self.load_document_references(doc, callback)
 
         return handle
 
+    def load_document_references(self, doc, callback):
+        if self.is_lazy:
+            callback(doc)
+        else:
+            doc.load_references(callback=self.handle_auto_load_references(doc, callback))
+
     @return_future
     def get(self, id=None, callback=None, alias=None, **kwargs):
         '''
@@ -592,6 +998,12 @@ class QuerySet(object):
             if not isinstance(id, ObjectId):
                 id = ObjectId(id)
 
+            session = self.get_session()
+            document = session.get(self.__klass__, id, alias=alias) if session is not None else None
+            if document is not None:
+                self.load_document_references(document, callback)
+                return
+
             filters = {
                 "_id": id
             }
@@ -599,9 +1011,9 @@ class QuerySet(object):
             filters = Q(**kwargs)
             filters = self.get_query_from_filters(filters)
 
-        self.coll(alias).find_one(
-            filters, projection=self._loaded_fields.to_query(self.__klass__),
-            callback=self.handle_get(callback)
+        self.coll(alias, document_class=self.get_read_document_class()).find_one(
+            filters, projection=self.get_projection(),
+            callback=self.handle_get(callback, alias=alias)
         )
 
     def get_query_from_filters(self, filters):
@@ -625,8 +1037,8 @@ class QuerySet(object):
 
         query_filters = self.get_query_from_filters(self._filters)
 
-        return self.coll(alias).find(
-            query_filters, projection=self._loaded_fields.to_query(self.__klass__),
+        return self.coll(alias, document_class=self.get_read_document_class()).find(
+            query_filters, projection=self.get_projection(),
             **find_arguments
         )
 
@@ -738,45 +1150,84 @@ class QuerySet(object):
 
     def handle_find_all_auto_load_references(self, callback, results):
         def handle(*arguments, **kwargs):
-            self.current_count += 1
-            if self.current_count == self.result_size:
-                self.current_count = None
-                self.result_size = None
-                callback(results)
+            callback(results)
 
         return handle
 
-    def handle_find_all(self, callback, lazy=None):
-        def handle(*arguments, **kwargs):
-            if arguments and len(arguments) > 1 and arguments[1]:
-                raise arguments[1]
+    def get_session(self):
+        '''
+        Returns the active session if the documents of this queryset can be kept in
+        (and served from) it, as only fully loaded documents are.
+        '''
+        if self._raw_mode is not None or self._loaded_fields:
+            return None
 
-            result = []
-            self.current_count = 0
-            self.result_size = len(arguments[0])
+        return get_current_session()
 
-            # if _loaded_fields is not empty then documents are partly loaded
-            is_partly_loaded = bool(self._loaded_fields)
+    def get_documents_from_son(self, son_list, alias=None, merge=False):
+        if self._raw_mode is not None:
+            return [self.get_raw_value_from_son(son) for son in son_list]
 
-            for doc in arguments[0]:
-                obj = self.__klass__.from_son(
-                    doc,
+        # if _loaded_fields is not empty then documents are partly loaded
+        is_partly_loaded = bool(self._loaded_fields)
+        session = self.get_session()
+
+        documents = []
+        loaded = []
+        for son in son_list:
+            document = None
+            if session is not None and not merge:
+                document = session.get(self.__klass__, son.get('_id'), alias=alias)
+
+            if document is None:
+                document = self.__klass__.from_son(
+                    son,
                     # set projections for references (if any)
                     _reference_loaded_fields=self._reference_loaded_fields,
                     _is_partly_loaded=is_partly_loaded
                 )
+                loaded.append(document)
+
+            documents.append(document)
 
-                result.append(obj)
+        self.defer_documents(loaded, alias=alias)
+
+        # documents with deferred fields are kept out of the session
+        if session is not None and not self._deferred_fields:
+            if merge:
+                documents = [session.merge(document, alias=alias) for document in documents]
+            else:
+                for document in loaded:
+                    session.add(document, alias=alias)
+
+        return documents
+
+    def load_documents_references(self, documents, callback, lazy=None, alias=None):
+        if self._raw_mode is not None:
+            callback(documents)
+            return
+
+        # references of all documents are fetched together, so each
+        # referenced collection is queried only once
+        dereference = Dereference(alias=alias)
+        for doc in documents:
+            if (lazy is not None and not lazy) or not doc.is_lazy:
+                doc.find_references(document=doc, dereference=dereference)
+
+        dereference.load(callback=self.handle_find_all_auto_load_references(callback, documents))
+
+    def handle_find_all(self, callback, lazy=None, alias=None):
+        def handle(*arguments, **kwargs):
+            if arguments and len(arguments) > 1 and arguments[1]:
+                raise arguments[1]
+
+            result = self.get_documents_from_son(arguments[0], alias=alias)
 
             if not result:
                 callback(result)
                 return
 
-            for doc in result:
-                if (lazy is not None and not lazy) or not doc.is_lazy:
-                    doc.load_references(doc._fields, callback=self.handle_find_all_auto_load_references(callback, result))
-                else:
-                    self.handle_find_all_auto_load_references(callback, result)()
+            self.load_documents_references(result, callback=callback, lazy=lazy, alias=alias)
 
         return handle
 
@@ -796,7 +1247,7 @@ class QuerySet(object):
                 # result is None if no users found
                 pass
         '''
-        to_list_arguments = dict(callback=self.handle_find_all(callback, lazy=lazy))
+        to_list_arguments = dict(callback=self.handle_find_all(callback, lazy=lazy, alias=alias))
 
         if self._limit is not None:
             to_list_arguments['length'] = self._limit
@@ -807,6 +1258,167 @@ class QuerySet(object):
 
         cursor.to_list(**to_list_arguments)
 
+    def get_pagination_sort(self):
+        sort = list(self._order_fields)
+        if '_id' not in [field_name for field_name, direction in sort]:
+            # _id is the tiebreaker that makes the order of documents unique
+            sort.append(('_id', ASCENDING))
+
+        return sort
+
+    def get_pagination_values(self, sort, last_doc_or_token):
+        from motorengine.document import BaseDocument
+
+        if not isinstance(last_doc_or_token, BaseDocument):
+            token_sort, values = decode_continuation_token(last_doc_or_token)
+            if token_sort != sort:
+                raise ValueError(
+                    "Invalid continuation token: it was generated for a different order (%s)." % token_sort
+                )
+
+            return values
+
+        values = []
+        for field_name, direction in sort:
+            if field_name == '_id':
+                values.append(last_doc_or_token._id)
+                continue
+
+            name = self.__klass__._reverse_db_field_map[field_name]
+            field = self.__klass__._fields[name]
+            values.append(field.to_son(last_doc_or_token.get_field_value(name)))
+
+        return values
+
+    def get_pagination_query(self, sort, values):
+        conditions = []
+
+        for index, (field_name, direction) in enumerate(sort):
+            condition = dict(
+                (previous_field_name, previous_value)
+                for (previous_field_name, previous_direction), previous_value in zip(sort[:index], values[:index])
+            )
+            operator = direction == ASCENDING and '$gt' or '$lt'
+            condition[field_name] = {operator: values[index]}
+            conditions.append(condition)
+
+        seek_query = {'$or': conditions}
+        query_filters = self.get_query_from_filters(self._filters)
+
+        if not query_filters:
+            return seek_query
+
+        return {'$and': [query_filters, seek_query]}
+
+    def get_pagination_projection(self, sort):
+        projection = self.get_projection()
+        if not projection:
+            return projection
+
+        # the continuation token is built from the sort fields, so they must be loaded
+        is_including = any(value == QueryFieldList.ONLY for value in projection.values())
+        for field_name, direction in sort:
+            if is_including:
+                projection[field_name] = QueryFieldList.ONLY
+            elif projection.get(field_name) == QueryFieldList.EXCLUDE:
+                del projection[field_name]
+
+        return projection
+
+    def handle_paginate_after(self, callback, sort, page_size, lazy=None, alias=None):
+        def handle(*arguments, **kwargs):
+            if arguments and len(arguments) > 1 and arguments[1]:
+                raise arguments[1]
+
+            page = arguments[0][:page_size]
+
+            next_token = None
+            if len(arguments[0]) > page_size:
+                next_token = encode_continuation_token(sort, [page[-1].get(field_name) for field_name, direction in sort])
+
+            documents = self.get_documents_from_son(page, alias=alias)
+            self.load_documents_references(
+                documents, callback=self.handle_paginated_documents(callback, next_token),
+                lazy=lazy, alias=alias
+            )
+
+        return handle
+
+    def handle_paginated_documents(self, callback, next_token):
+        def handle(documents):
+            callback(edict({
+                "documents": documents,
+                "next_token": next_token
+            }))
+
+        return handle
+
+    @return_future
+    def paginate_after(self, last_doc_or_token=None, page_size=20, callback=None, lazy=None, alias=None):
+        '''
+        Returns a page of `page_size` documents of the current queryset collection that come right after
+        `last_doc_or_token` in the current order (or the first page if it is `None`).
+
+        Instead of skipping documents, the page is found using a range query over the `order_by`
+        fields plus `_id` (as a tiebreaker), so fetching deep pages costs the same as fetching the
+        first one when those fields are indexed.
+
+        The result has the `documents` of the page and a `next_token` that should be passed to get
+        the next page (`next_token` is `None` in the last page).
+
+        Usage::
+
+            page = yield User.objects.filter(active=True).order_by('name').paginate_after(page_size=50)
+
+            while page.next_token is not None:
+                page = yield User.objects.filter(active=True).order_by('name').paginate_after(
+                    page.next_token, page_size=50
+                )
+        '''
+        if page_size is None or page_size < 1:
+            raise ValueError("The page_size argument must be a positive integer, not '%s'." % page_size)
+
+        sort = self.get_pagination_sort()
+
+        if last_doc_or_token is None:
+            query_filters = self.get_query_from_filters(self._filters)
+        else:
+            values = self.get_pagination_values(sort, last_doc_or_token)
+            query_filters = self.get_pagination_query(sort, values)
+
+        cursor = self.coll(alias, document_class=self.get_read_document_class()).find(
+            query_filters, projection=self.get_pagination_projection(sort),
+            sort=sort, limit=page_size + 1
+        )
+        cursor.to_list(
+            page_size + 1,
+            callback=self.handle_paginate_after(callback, sort, page_size, lazy=lazy, alias=alias)
+        )
+
+    def stream(self, batch_size=DEFAULT_BATCH_SIZE, lazy=None, alias=None):
+        '''
+        Returns a :py:class:`~motorengine.stream.QueryStream` that iterates over all the items in the
+        current queryset collection that match specified filters (if any), fetching `batch_size`
+        documents at a time.
+
+        Unlike `find_all`, the result set is not truncated and is never fully loaded in memory.
+
+        Usage::
+
+            stream = User.objects.filter(active=True).stream(batch_size=500)
+
+            while (yield stream.fetch_next):
+                user = stream.next_object()
+
+            # or, in python 3.5+
+            async for user in User.objects.filter(active=True):
+                pass
+        '''
+        return QueryStream(self, batch_size=batch_size, lazy=lazy, alias=alias)
+
+    def __aiter__(self):
+        return self.stream().__aiter__()
+
     def handle_count(self, callback):
         def handle(*arguments, **kwargs):
             if arguments and len(arguments) > 1 and arguments[1]:
@@ -827,40 +1439,111 @@ class QuerySet(object):
     def aggregate(self):
         return Aggregation(self)
 
-    def handle_ensure_index(self, callback, created_indexes, total_indexes):
+    def bulk(self, ordered=True):
+        '''
+        Returns a :py:class:`motorengine.bulk.BulkOperation` that sends many inserts,
+        updates, upserts and deletes of documents of this class in a single bulk write.
+        '''
+        return BulkOperation(self, ordered=ordered)
+
+    def handle_ensure_index(self, callback, total_indexes):
+        def handle(*arguments, **kw):
+            if len(arguments) > 1 and arguments[1]:
+                raise arguments[1]
+
+            callback(total_indexes)
+
+        return handle
+
+    def handle_index_information(self, callback, index_models, alias=None):
         def handle(*arguments, **kw):
             if len(arguments) > 1 and arguments[1]:
                 raise arguments[1]
 
-            created_indexes.append(arguments[0])
+            updates, drops, missing_index_models = get_index_changes(index_models, arguments[0])
 
-            if len(created_indexes) < total_indexes:
+            self.change_indexes(
+                updates, drops,
+                callback=self.handle_indexes_changed(callback, index_models, missing_index_models, alias=alias),
+                alias=alias
+            )
+
+        return handle
+
+    def handle_indexes_changed(self, callback, index_models, missing_index_models, alias=None):
+        def handle():
+            if not missing_index_models:
+                callback(len(index_models))
                 return
 
-            callback(total_indexes)
+            self.coll(alias).create_indexes(
+                missing_index_models,
+                callback=self.handle_ensure_index(callback, len(index_models))
+            )
+
+        return handle
+
+    def change_indexes(self, updates, drops, callback, alias=None):
+        '''
+        Applies the new `expireAfterSeconds` of existing TTL indexes with `collMod` and
+        drops the existing indexes whose options changed otherwise (so they are created
+        again), one at a time, then calls `callback`.
+        '''
+        if updates:
+            coll = self.coll(alias)
+            coll.database.command(
+                'collMod', coll.name, index=updates[0],
+                callback=self.handle_index_changed(updates[1:], drops, callback, alias=alias)
+            )
+        elif drops:
+            self.coll(alias).drop_index(
+                drops[0], callback=self.handle_index_changed(updates, drops[1:], callback, alias=alias)
+            )
+        else:
+            callback()
+
+    def handle_index_changed(self, updates, drops, callback, alias=None):
+        def handle(*arguments, **kw):
+            if len(arguments) > 1 and arguments[1]:
+                raise arguments[1]
+
+            self.change_indexes(updates, drops, callback, alias=alias)
+
+        return handle
+
+    @return_future
+    def sync_indexes(self, callback, alias=None):
+        '''
+        Creates the indexes for this document class, even if they were already created
+        by an earlier write in this process. Writes issued meanwhile wait for it to finish.
+        '''
+        IOLoop.current().add_future(
+            index_registry.sync(self, alias=alias, force=True),
+            self.handle_indexes_synced_result(callback)
+        )
+
+    def handle_indexes_synced_result(self, callback):
+        def handle(indexes):
+            callback(indexes.result())
 
         return handle
 
     @return_future
     def ensure_index(self, callback, alias=None):
-        fields_with_index = []
-        for field_name, field in self.__klass__._fields.items():
-            if field.unique or field.sparse:
-                fields_with_index.append(field)
-
-        created_indexes = []
-
-        for field in fields_with_index:
-            self.coll(alias).ensure_index(
-                field.db_field,
-                unique=field.unique,
-                sparse=field.sparse,
-                callback=self.handle_ensure_index(
-                    callback,
-                    created_indexes,
-                    len(fields_with_index)
-                ),
-            )
+        '''
+        Creates the indexes declared for this document class (see
+        :func:`~motorengine.indexes.get_index_models`) that do not exist yet in its
+        collection, with a single `createIndexes` command. Indexes declared with the
+        name of an existing index and different options are updated in place with
+        `collMod` when only their `expireAfterSeconds` changed, or dropped and created
+        again otherwise. Resolves to the number of indexes declared.
+        '''
+        index_models = get_index_models(self.__klass__)
 
-        if not fields_with_index:
+        if not index_models:
             callback(0)
+            return
+
+        self.coll(alias).index_information(
+            callback=self.handle_index_information(callback, index_models, alias=alias)
+        )
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import contextlib
+import threading
+
+from tornado.stack_context import StackContext
+
+from motorengine.connection import DEFAULT_CONNECTION_NAME
+
+
+class SessionState(threading.local):
+    def __init__(self):
+        self.session = None
+
+
+_state = SessionState()
+
+
+def get_current_session():
+    '''
+    Returns the session active in the current stack context or None.
+    '''
+    return _state.session
+
+
+class Session(object):
+    '''
+    Identity map of the documents loaded or saved while the session is active, keyed
+    by connection alias, document class and `_id`.
+
+    While a session is active, `get` by id and the loading of references are served
+    from the session when the document is already in it. `find_all` (and `stream`,
+    `paginate_after` and `get` with filters) still query MongoDB, but return the
+    instances already in the session for the documents they find. This way every
+    part of a request sees the same instance of a document (and its changes).
+
+    Only fully loaded documents are kept: documents loaded with `only`, `exclude`,
+    `fields` or `defer` are neither added to nor served from the session. Updates
+    made with `update` or `bulk` are not reflected in the documents of the session.
+
+    A session is bound to a tornado `StackContext`, so it stays active in all the
+    callbacks (and coroutine steps) started while it is active. `run` calls a
+    function (usually a coroutine) with the session active and returns its result::
+
+        @gen.coroutine
+        def handle_request(post_id):
+            post = yield Post.objects.get(post_id)
+            yield post.load_references()
+
+        yield Session().run(handle_request, post_id)
+
+    Like any `StackContext`, it can also be used as a context manager, as long as
+    the block does not `yield`::
+
+        with Session():
+            Post.objects.get(post_id, callback=handle_post)
+    '''
+
+    def __init__(self):
+        self.documents = {}
+        self.stack_contexts = []
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __contains__(self, document):
+        return self.get(type(document), document._id) is document
+
+    def get_alias(self, document_type, alias=None):
+        if alias is None:
+            alias = document_type.__alias__ or DEFAULT_CONNECTION_NAME
+
+        return alias
+
+    def get(self, document_type, _id, alias=None):
+        '''
+        Returns the document of the given class and `_id` loaded from the database of
+        the given alias in this session or None.
+        '''
+        if _id is None:
+            return None
+
+        return self.documents.get((self.get_alias(document_type, alias), document_type, _id))
+
+    def add(self, document, alias=None):
+        if document._id is not None:
+            document_type = type(document)
+            self.documents[(self.get_alias(document_type, alias), document_type, document._id)] = document
+
+    def merge(self, document, alias=None):
+        '''
+        Returns the instance of the document in this session, after replacing its
+        values with the values of the given (freshly loaded) document, or adds the
+        document to the session and returns it if the session does not have it.
+        '''
+        instance = self.get(type(document), document._id, alias=alias)
+
+        if instance is None:
+            self.add(document, alias=alias)
+            return document
+
+        if instance is not document:
+            # the freshly loaded document is dropped, so its values are taken as they are
+            object.__setattr__(instance, '_values', document._values)
+            instance.clear_changes()
+
+        return instance
+
+    def discard(self, document, alias=None):
+        document_type = type(document)
+        self.documents.pop((self.get_alias(document_type, alias), document_type, document._id), None)
+
+    def discard_type(self, document_type, alias=None):
+        '''
+        Removes all the documents of the given class loaded from the database of the
+        given alias from this session.
+        '''
+        alias = self.get_alias(document_type, alias)
+
+        for key in [key for key in self.documents if key[0] == alias and key[1] is document_type]:
+            del self.documents[key]
+
+    def clear(self):
+        self.documents.clear()
+
+    @contextlib.contextmanager
+    def activate(self):
+        previous = _state.session
+        _state.session = self
+
+        try:
+            yield
+        finally:
+            _state.session = previous
+
+    def __enter__(self):
+        stack_context = StackContext(self.activate)
+        self.stack_contexts.append(stack_context)
+        stack_context.__enter__()
+
+        return self
+
+    def __exit__(self, *exc_info):
+        return self.stack_contexts.pop().__exit__(*exc_info)
+
+    def run(self, function, *args, **kwargs):
+        '''
+        Calls the function with this session active and returns its result.
+        '''
+        with self:
+            return function(*args, **kwargs)
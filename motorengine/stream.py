@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import deque
+
+from tornado.concurrent import Future, return_future
+
+try:
+    StopAsyncIteration = StopAsyncIteration
+except NameError:  # python < 3.5 has no async iteration
+    StopAsyncIteration = StopIteration
+
+DEFAULT_BATCH_SIZE = 100
+
+
+class QueryStream(object):
+    '''
+    Iterates over the documents matched by a queryset, fetching and hydrating
+    `batch_size` documents at a time from a single cursor, so memory usage
+    does not grow with the size of the result set.
+
+    Usage::
+
+        stream = User.objects.filter(active=True).stream(batch_size=500)
+
+        while (yield stream.fetch_next):
+            user = stream.next_object()
+
+    In python 3.5+ the stream (or the queryset itself) can be used with `async for`::
+
+        async for user in User.objects.filter(active=True):
+            pass
+    '''
+
+    def __init__(self, queryset, batch_size=DEFAULT_BATCH_SIZE, lazy=None, alias=None):
+        if batch_size is None or batch_size < 1:
+            raise ValueError("The batch_size argument must be a positive integer, not '%s'." % batch_size)
+
+        self.queryset = queryset
+        self.batch_size = batch_size
+        self.lazy = lazy
+        self.alias = alias
+
+        self.cursor = None
+        self.exhausted = False
+        self.documents = deque()
+
+    def get_cursor(self):
+        if self.cursor is None:
+            self.cursor = self.queryset._get_find_cursor(alias=self.alias)
+            self.cursor.batch_size(self.batch_size)
+
+        return self.cursor
+
+    def handle_fetch_batch(self, callback):
+        def handle(*arguments, **kw):
+            if arguments and len(arguments) > 1 and arguments[1]:
+                raise arguments[1]
+
+            if len(arguments[0]) < self.batch_size:
+                self.exhausted = True
+
+            if not arguments[0]:
+                callback(False)
+                return
+
+            documents = self.queryset.get_documents_from_son(arguments[0], alias=self.alias)
+            self.queryset.load_documents_references(
+                documents, callback=self.handle_loaded_batch(callback),
+                lazy=self.lazy, alias=self.alias
+            )
+
+        return handle
+
+    def handle_loaded_batch(self, callback):
+        def handle(documents):
+            self.documents.extend(documents)
+            callback(True)
+
+        return handle
+
+    @return_future
+    def fetch_batch(self, callback):
+        '''
+        Fetches and hydrates the next batch of documents. Resolves to `False`
+        when there are no more documents to fetch.
+        '''
+        if self.exhausted:
+            callback(False)
+            return
+
+        self.get_cursor().to_list(self.batch_size, callback=self.handle_fetch_batch(callback))
+
+    @property
+    def fetch_next(self):
+        '''
+        A Future that resolves to `True` if there is a document available
+        in `next_object`, fetching the next batch only when needed.
+        '''
+        if self.documents or self.exhausted:
+            future = Future()
+            future.set_result(bool(self.documents))
+            return future
+
+        return self.fetch_batch()
+
+    def next_object(self):
+        '''
+        Returns the next fetched document (or None if no document was fetched).
+        '''
+        if not self.documents:
+            return None
+
+        return self.documents.popleft()
+
+    def handle_next_document(self, future):
+        def handle(fetched):
+            if fetched.exception() is not None:
+                future.set_exception(fetched.exception())
+            elif fetched.result():
+                future.set_result(self.documents.popleft())
+            else:
+                future.set_exception(StopAsyncIteration())
+
+        return handle
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        future = Future()
+        self.fetch_next.add_done_callback(self.handle_next_document(future))
+        return future
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+def mark_list_as_changed(method):
+    def mutate(self, *args, **kw):
+        self.changed = True
+        return method(self, *args, **kw)
+
+    mutate.__name__ = method.__name__
+    return mutate
+
+
+class TrackedList(list):
+    '''
+    List that records whether it was changed in place, so saving a loaded document
+    only sends its list fields to MongoDB if they were modified.
+    '''
+
+    __slots__ = ('changed', )
+
+    def __init__(self, *args, **kw):
+        super(TrackedList, self).__init__(*args, **kw)
+        self.changed = False
+
+    append = mark_list_as_changed(list.append)
+    extend = mark_list_as_changed(list.extend)
+    insert = mark_list_as_changed(list.insert)
+    pop = mark_list_as_changed(list.pop)
+    remove = mark_list_as_changed(list.remove)
+    reverse = mark_list_as_changed(list.reverse)
+    sort = mark_list_as_changed(list.sort)
+    __setitem__ = mark_list_as_changed(list.__setitem__)
+    __delitem__ = mark_list_as_changed(list.__delitem__)
+    __iadd__ = mark_list_as_changed(list.__iadd__)
+    __imul__ = mark_list_as_changed(list.__imul__)
+
+    if hasattr(list, '__setslice__'):  # python 2
+        __setslice__ = mark_list_as_changed(list.__setslice__)
+        __delslice__ = mark_list_as_changed(list.__delslice__)
+
+    if hasattr(list, 'clear'):
+        clear = mark_list_as_changed(list.clear)
+
+    def loaded_items(self):
+        '''
+        Returns the items that may have been changed (see `motorengine.values.LazyList`).
+        '''
+        return list.__iter__(self)
+
+    def __reduce_ex__(self, protocol):
+        return (TrackedList, (list(self), ))
+
+
+def has_value_changed(value, check_documents=True):
+    '''
+    Returns if a field value may have changed since it was loaded or saved. Lists
+    and dicts that are not tracked are always considered changed.
+    '''
+    if isinstance(value, TrackedList):
+        if value.changed:
+            return True
+        return any(has_value_changed(item, check_documents) for item in value.loaded_items())
+
+    if hasattr(value, 'has_changed'):
+        return check_documents and value.has_changed()
+
+    return isinstance(value, (list, dict, set))
+
+
+def clear_value_changes(value, clear_documents=True):
+    if isinstance(value, TrackedList):
+        value.changed = False
+        for item in value.loaded_items():
+            clear_value_changes(item, clear_documents)
+    elif clear_documents and hasattr(value, 'clear_changes'):
+        value.clear_changes()
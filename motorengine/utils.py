@@ -2,6 +2,10 @@
 # -*- coding: utf-8 -*-
 
 import sys
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+
+import six
+from bson import BSON
 
 
 try:
@@ -46,3 +50,17 @@ def get_class(module_name, klass=None):
     except AttributeError:
         err = sys.exc_info()
         raise ImportError("Can't find class %s (%s)." % (module_name, str(err)))
+
+
+def encode_continuation_token(sort, values):
+    token = BSON.encode({'s': [list(item) for item in sort], 'v': values})
+    return urlsafe_b64encode(token).decode('ascii')
+
+
+def decode_continuation_token(token):
+    try:
+        data = BSON(urlsafe_b64decode(six.b(token) if isinstance(token, six.text_type) else token)).decode()
+        return [tuple(item) for item in data['s']], data['v']
+    except Exception:
+        err = sys.exc_info()
+        raise ValueError("Invalid continuation token %r (%s)." % (token, str(err[1])))
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from motorengine.tracking import TrackedList
+
+
+class DecodedSon(dict):
+    '''
+    Dict that pymongo decodes the documents of classes declared with
+    `__decode_values__ = True` (and all their subdocuments) into, as the
+    `document_class` of the collection codec options.
+
+    It does not override any dict method, so pymongo fills it as fast as a dict, but
+    `Document.from_son` can turn it into the `DecodedValues` of the document itself
+    instead of copying it into a new dict.
+    '''
+
+    __slots__ = ('converters', )
+
+    def __reduce_ex__(self, protocol):
+        return (dict, (dict(self), ))
+
+
+class DecodedValues(DecodedSon):
+    '''
+    Values of a document adopted from the `DecodedSon` pymongo decoded it into.
+
+    Values of fields with a `from_son` conversion (embedded documents, lists and the
+    likes) are kept as decoded until they are first read.
+    '''
+
+    __slots__ = ()
+
+    def __init__(self, *args, **kw):
+        super(DecodedValues, self).__init__(*args, **kw)
+        self.converters = None
+
+    def convert(self, name):
+        value = self.converters.pop(name)(dict.__getitem__(self, name))
+        dict.__setitem__(self, name, value)
+        return value
+
+    def convert_all(self):
+        converters = self.converters
+        if converters:
+            for name in list(converters):
+                self.convert(name)
+
+    def __getitem__(self, name):
+        converters = self.converters
+        if converters and name in converters:
+            return self.convert(name)
+
+        return dict.__getitem__(self, name)
+
+    def get(self, name, default=None):
+        converters = self.converters
+        if converters and name in converters:
+            return self.convert(name)
+
+        return dict.get(self, name, default)
+
+    def __setitem__(self, name, value):
+        if self.converters:
+            self.converters.pop(name, None)
+
+        dict.__setitem__(self, name, value)
+
+    def __delitem__(self, name):
+        if self.converters:
+            self.converters.pop(name, None)
+
+        dict.__delitem__(self, name)
+
+    def pop(self, name, *default):
+        converters = self.converters
+        if converters and name in converters:
+            self.convert(name)
+
+        return dict.pop(self, name, *default)
+
+    def setdefault(self, name, default=None):
+        if name in self:
+            return self[name]
+
+        dict.__setitem__(self, name, default)
+        return default
+
+    def update(self, *args, **kw):
+        for name, value in dict(*args, **kw).items():
+            self[name] = value
+
+    def items(self):
+        self.convert_all()
+        return dict.items(self)
+
+    def values(self):
+        self.convert_all()
+        return dict.values(self)
+
+    def copy(self):
+        self.convert_all()
+        return dict(self)
+
+    def __reduce_ex__(self, protocol):
+        return (dict, (self.copy(), ))
+
+
+class LazyEmbeddedDocument(object):
+    '''
+    SON of an embedded document kept in the values of a loaded document until the
+    embedded document field is first read (see `EmbeddedDocumentField.lazy_from_son`).
+
+    Serializing the document sends the SON back as-is and, as it can't be changed
+    without being read, it is never considered changed.
+    '''
+
+    __slots__ = ('son', )
+
+    def __init__(self, son):
+        self.son = son
+
+    def __reduce_ex__(self, protocol):
+        return (LazyEmbeddedDocument, (self.son, ))
+
+
+def convert_list_before(method):
+    def convert(self, *args, **kw):
+        self.convert_all()
+        return method(self, *args, **kw)
+
+    convert.__name__ = method.__name__
+    return convert
+
+
+class LazyList(TrackedList):
+    '''
+    TrackedList of the SON of the items of a loaded list field, where each item is
+    converted with `converter` (i.e.: into an embedded document) when it is first read,
+    either by index or when iterating the list reaches it.
+
+    `loaded` flags the items already converted, or is None once all of them are.
+    Serializing the list sends the items that were never read as-is.
+    '''
+
+    __slots__ = ('converter', 'loaded')
+
+    def __init__(self, items=(), converter=None):
+        super(LazyList, self).__init__(items)
+        self.converter = converter
+        self.loaded = bytearray(list.__len__(self)) if converter is not None and self else None
+
+    def convert(self, index):
+        value = self.converter(list.__getitem__(self, index))
+        list.__setitem__(self, index, value)
+        self.loaded[index] = 1
+        return value
+
+    def convert_all(self):
+        loaded = self.loaded
+        if loaded is None:
+            return
+
+        converter = self.converter
+        for index, is_loaded in enumerate(loaded):
+            if not is_loaded:
+                list.__setitem__(self, index, converter(list.__getitem__(self, index)))
+
+        self.loaded = None
+
+    def loaded_items(self):
+        loaded = self.loaded
+        if loaded is None:
+            return list.__iter__(self)
+
+        return (item for item, is_loaded in zip(list.__iter__(self), loaded) if is_loaded)
+
+    def __getitem__(self, index):
+        loaded = self.loaded
+        if loaded is not None:
+            if isinstance(index, slice):
+                for item_index in range(*index.indices(list.__len__(self))):
+                    if not loaded[item_index]:
+                        self.convert(item_index)
+            elif not loaded[index]:
+                return self.convert(index)
+
+        return list.__getitem__(self, index)
+
+    def __setitem__(self, index, value):
+        if self.loaded is not None and isinstance(index, int):
+            self.loaded[index] = 1
+        else:
+            self.convert_all()
+
+        TrackedList.__setitem__(self, index, value)
+
+    def __iter__(self):
+        if self.loaded is None:
+            return list.__iter__(self)
+
+        return self.iterate()
+
+    def iterate(self):
+        index = 0
+        while index < list.__len__(self):
+            yield self[index]
+            index += 1
+
+        if self.loaded is not None and all(self.loaded):
+            self.loaded = None
+
+    # methods that read every item, change the positions of the items or use them
+    # from C code convert all the items first
+    append = convert_list_before(TrackedList.append)
+    extend = convert_list_before(TrackedList.extend)
+    insert = convert_list_before(TrackedList.insert)
+    pop = convert_list_before(TrackedList.pop)
+    remove = convert_list_before(TrackedList.remove)
+    reverse = convert_list_before(TrackedList.reverse)
+    sort = convert_list_before(TrackedList.sort)
+    __delitem__ = convert_list_before(TrackedList.__delitem__)
+    __iadd__ = convert_list_before(TrackedList.__iadd__)
+    __imul__ = convert_list_before(TrackedList.__imul__)
+
+    index = convert_list_before(list.index)
+    count = convert_list_before(list.count)
+    __contains__ = convert_list_before(list.__contains__)
+    __reversed__ = convert_list_before(list.__reversed__)
+    __add__ = convert_list_before(list.__add__)
+    __mul__ = convert_list_before(list.__mul__)
+    __rmul__ = convert_list_before(list.__rmul__)
+    __eq__ = convert_list_before(list.__eq__)
+    __ne__ = convert_list_before(list.__ne__)
+    __lt__ = convert_list_before(list.__lt__)
+    __le__ = convert_list_before(list.__le__)
+    __gt__ = convert_list_before(list.__gt__)
+    __ge__ = convert_list_before(list.__ge__)
+    __repr__ = convert_list_before(list.__repr__)
+
+    if hasattr(list, '__getslice__'):  # python 2
+        __getslice__ = convert_list_before(list.__getslice__)
+        __setslice__ = convert_list_before(TrackedList.__setslice__)
+        __delslice__ = convert_list_before(TrackedList.__delslice__)
+
+    if hasattr(list, 'clear'):
+        clear = convert_list_before(TrackedList.clear)
+
+    if hasattr(list, 'copy'):
+        copy = convert_list_before(list.copy)
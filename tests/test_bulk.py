@@ -7,8 +7,9 @@ from preggy import expect
 from tornado.testing import gen_test
 
 from motorengine import (
-    Document, StringField
+    Document, StringField, IntField, Q
 )
+from motorengine.errors import BulkInsertError, LoadDeferredRequiredError
 from tests import AsyncTestCase
 
 
@@ -17,10 +18,17 @@ class Comment(Document):
     text = StringField(required=True)
 
 
+class Counter(Document):
+    __collection__ = "CounterBulk"
+    name = StringField(unique=True)
+    value = IntField(default=0)
+
+
 class TestBulkInsert(AsyncTestCase):
     def setUp(self):
         super(TestBulkInsert, self).setUp()
         self.drop_coll("CommentBulk")
+        self.drop_coll("CounterBulk")
 
     @gen_test
     def test_can_insert_in_bulk(self):
@@ -38,6 +46,22 @@ class TestBulkInsert(AsyncTestCase):
         for comment in comments:
             expect(comment._id).not_to_be_null()
 
+    @gen_test
+    def test_bulk_insert_does_not_run_on_save(self):
+        class SizedComment(Document):
+            __collection__ = "CommentBulk"
+            text = StringField(required=True)
+            size = IntField(default=0, on_save=lambda doc, creating: len(doc.text))
+
+        comments = [SizedComment(text="comment")]
+
+        yield SizedComment.objects.bulk_insert(comments)
+
+        expect(comments[0].size).to_equal(0)
+
+        loaded = yield SizedComment.objects.get(comments[0]._id)
+        expect(loaded.size).to_equal(0)
+
     @gen_test
     def test_cant_insert_wrong_document_in_bulk(self):
         class OtherDoc(Document):
@@ -74,3 +98,162 @@ class TestBulkInsert(AsyncTestCase):
             )
         else:
             assert False, "Should not have gotten this far"
+
+    @gen_test
+    def test_nothing_is_inserted_when_a_later_document_is_invalid(self):
+        comments = [Comment(text=str(number)) for number in range(5)] + [Comment(text=None)]
+
+        try:
+            yield Comment.objects.bulk_insert(comments, chunk_size=2)
+        except ValueError:
+            err = sys.exc_info()[1]
+            expect(err).to_have_an_error_message_of(
+                "Validation for document 5 in the documents you are saving failed with: "
+                "Field 'text' is required."
+            )
+        else:
+            assert False, "Should not have gotten this far"
+
+        count = yield Comment.objects.count()
+        expect(count).to_equal(0)
+
+
+    @gen_test
+    def test_can_insert_in_chunks(self):
+        comments = [
+            Comment(text=str(number))
+            for number in range(25)
+        ]
+
+        result = yield Comment.objects.bulk_insert(comments, chunk_size=10)
+
+        expect(result).to_equal(comments)
+        for comment in comments:
+            expect(comment._id).not_to_be_null()
+
+        count = yield Comment.objects.count()
+        expect(count).to_equal(25)
+
+    @gen_test
+    def test_can_insert_from_iterator(self):
+        result = yield Comment.objects.bulk_insert(
+            (Comment(text=str(number)) for number in range(7)),
+            chunk_size=3, ordered=False, concurrency=2
+        )
+
+        expect(result).to_equal(7)
+
+        count = yield Comment.objects.count()
+        expect(count).to_equal(7)
+
+    @gen_test
+    def test_unordered_insert_reports_failed_documents(self):
+        yield Counter.objects.create(name="duplicated")
+
+        counters = [Counter(name="1"), Counter(name=10), Counter(name="2"), Counter(name="duplicated")]
+
+        try:
+            yield Counter.objects.bulk_insert(counters, ordered=False, chunk_size=2)
+        except BulkInsertError:
+            err = sys.exc_info()[1]
+            expect(err.inserted).to_equal(2)
+            expect([error.index for error in err.errors]).to_equal([1, 3])
+            expect(err.errors[0].document).to_equal(counters[1])
+            expect(err.errors[1].code).to_equal(11000)
+        else:
+            assert False, "Should not have gotten this far"
+
+        count = yield Counter.objects.count()
+        expect(count).to_equal(3)
+
+class TestBulkOperation(AsyncTestCase):
+    def setUp(self):
+        super(TestBulkOperation, self).setUp()
+        self.drop_coll("CounterBulk")
+
+    @gen_test
+    def test_can_execute_mixed_operations(self):
+        first = yield Counter.objects.create(name="first")
+        yield Counter.objects.create(name="second")
+
+        loaded = yield Counter.objects.get(first._id)
+        loaded.value = 10
+        third = Counter(name="third")
+
+        bulk = Counter.objects.bulk()
+        bulk.insert(third)
+        bulk.update_one({"name": "second"}, inc__value=2)
+        bulk.upsert(Q(name="fourth"), set__value=4)
+        bulk.save(loaded)
+        bulk.delete_many({"name": "unknown"})
+
+        expect(bulk).to_length(5)
+
+        result = yield bulk.execute()
+
+        expect(result.inserted_count).to_equal(1)
+        expect(result.matched_count).to_equal(2)
+        expect(result.upserted_count).to_equal(1)
+        expect(result.deleted_count).to_equal(0)
+        expect(result.errors).to_be_empty()
+        expect(third._id).not_to_be_null()
+        expect(loaded.get_changed_fields()).to_be_empty()
+
+        counters = yield Counter.objects.order_by("value").find_all()
+        expect([(counter.name, counter.value) for counter in counters]).to_be_like([
+            ("third", 0), ("second", 2), ("fourth", 4), ("first", 10)
+        ])
+
+    @gen_test
+    def test_returns_errors_of_failed_operations(self):
+        yield Counter.objects.create(name="first")
+
+        bulk = Counter.objects.bulk(ordered=False)
+        bulk.insert(Counter(name="first"))
+        bulk.insert(Counter(name="second"))
+
+        result = yield bulk.execute()
+
+        expect(result.inserted_count).to_equal(1)
+        expect(result.errors).to_length(1)
+        expect(result.errors[0].index).to_equal(0)
+        expect(result.errors[0].code).to_equal(11000)
+        expect(result.errors[0].operation).to_equal("InsertOne")
+
+        count = yield Counter.objects.count()
+        expect(count).to_equal(2)
+
+    def test_cant_add_invalid_document(self):
+        bulk = Counter.objects.bulk()
+
+        try:
+            bulk.insert(Counter(name=10))
+        except ValueError:
+            err = sys.exc_info()[1]
+            expect(err).to_have_an_error_message_of(
+                "Validation for operation 0 in the bulk operation failed with: Field 'name' must be valid."
+            )
+        else:
+            assert False, "Should not have gotten this far"
+
+    @gen_test
+    def test_cant_replace_document_with_deferred_fields(self):
+        counter = yield Counter.objects.create(name="first", value=10)
+
+        loaded = yield Counter.objects.defer("value").get(counter._id)
+        loaded.name = "other"
+
+        bulk = Counter.objects.bulk()
+
+        try:
+            bulk.replace({"name": "first"}, loaded)
+        except LoadDeferredRequiredError:
+            err = sys.exc_info()[1]
+            expect(err).to_have_an_error_message_of(
+                "Document Counter can't be written in full before its deferred fields are "
+                "loaded with 'load_deferred'"
+            )
+        else:
+            assert False, "Should not have gotten this far"
+
+        expect(bulk).to_length(0)
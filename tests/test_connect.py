@@ -5,11 +5,18 @@ import sys
 
 from preggy import expect
 
-from motorengine import connect
+from motorengine import connect, disconnect, Document, StringField
+from motorengine.buffer import write_buffers
 from motorengine.connection import ConnectionError
+from motorengine.errors import WriteBufferClosedError
 from tests import AsyncTestCase
 
 
+class BufferedLog(Document):
+    __write_buffer__ = {"delay": 10}
+    message = StringField()
+
+
 class TestConnect(AsyncTestCase):
     def setUp(self):
         super(TestConnect, self).setUp(auto_connect=False)
@@ -27,3 +34,15 @@ class TestConnect(AsyncTestCase):
         args, kwargs = self.exec_async(db.ping)
         ping_result = args[0]['ok']
         expect(ping_result).to_equal(1.0)
+
+    def test_disconnect_closes_write_buffers(self):
+        connect('test', host="localhost", port=27017, io_loop=self.io_loop)
+
+        write_buffer = write_buffers.get(BufferedLog.objects)
+        inserted = write_buffer.insert({"message": "pending"})
+
+        disconnect()
+
+        expect(inserted.exception()).to_be_instance_of(WriteBufferClosedError)
+        expect(write_buffer.timeout).to_be_null()
+        expect(write_buffers.get(BufferedLog.objects) is write_buffer).to_be_false()
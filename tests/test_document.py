@@ -2,20 +2,27 @@
 # -*- coding: utf-8 -*-
 
 import sys
+import pickle
 from uuid import uuid4
 from datetime import datetime
 
 from preggy import expect
+from tornado import gen
 from tornado.testing import gen_test
 from bson.objectid import ObjectId
 
 from motorengine import (
-    Document, StringField, BooleanField, ListField,
+    Document, EmbeddedDocument, StringField, BooleanField, ListField,
     EmbeddedDocumentField, ReferenceField, DESCENDING,
     URLField, DateTimeField, UUIDField, IntField, JsonField
 )
-from motorengine import Q
-from motorengine.errors import InvalidDocumentError, LoadReferencesRequiredError, UniqueKeyViolationError
+from motorengine import Q, Session, sync_indexes, flush_write_buffers
+from motorengine.errors import (
+    InvalidDocumentError, LoadReferencesRequiredError, LoadDeferredRequiredError, PartlyLoadedDocumentError,
+    UniqueKeyViolationError
+)
+from motorengine.indexes import index_registry
+from motorengine.queryset import QuerySet
 from tests import AsyncTestCase
 
 
@@ -60,6 +67,12 @@ class EmployeeWithId(Document):
     id = StringField()
 
 
+class CompactDeferredPost(Document):
+    __compact__ = True
+    title = StringField()
+    body = StringField()
+
+
 class TestDocument(AsyncTestCase):
     def setUp(self):
         super(TestDocument, self).setUp()
@@ -69,6 +82,25 @@ class TestDocument(AsyncTestCase):
         self.drop_coll("Comment")
         self.drop_coll("CommentNotLazy")
 
+    def record_queries(self, document_type):
+        '''
+        Returns the list the projections of the `find_all` queries of the given
+        document type are appended to until the end of the test.
+        '''
+        queries = []
+        find_all = QuerySet.find_all
+
+        def recording_find_all(queryset, *args, **kwargs):
+            if queryset.__klass__ is document_type:
+                queries.append(queryset.get_projection())
+
+            return find_all(queryset, *args, **kwargs)
+
+        QuerySet.find_all = recording_find_all
+        self.addCleanup(setattr, QuerySet, 'find_all', find_all)
+
+        return queries
+
     def test_has_proper_collection(self):
         assert User.__collection__ == 'User'
 
@@ -927,6 +959,241 @@ class TestDocument(AsyncTestCase):
 
         expect(count).to_equal(4)
 
+    @gen_test
+    def test_can_update_using_atomic_operators(self):
+        class Comment(Document):
+            author = StringField(db_field="a")
+            likes = IntField(default=0)
+
+        class Post(Document):
+            __collection__ = "AtomicUpdatePost"
+            title = StringField()
+            views = IntField(db_field="v", default=0)
+            tags = ListField(StringField())
+            comments = ListField(EmbeddedDocumentField(Comment))
+
+        yield Post.objects.delete()
+        post = yield Post.objects.create(
+            title="Hello", tags=["a"], comments=[Comment(author="bernardo"), Comment(author="heynemann")]
+        )
+
+        result = yield Post.objects.filter(title="Hello").update(inc__views=2, push__tags="b", add_to_set__tags="a")
+        expect(result.count).to_equal(1)
+
+        yield Post.objects.filter(title="Hello", comments__author="heynemann").update(
+            {Post.title: "World"}, inc__comments__S__likes=1
+        )
+        yield Post.objects.filter(title="World").update(pull__comments__author="bernardo", dec__views=1)
+
+        loaded = yield Post.objects.get(post._id)
+        expect(loaded.title).to_equal("World")
+        expect(loaded.views).to_equal(1)
+        expect(loaded.tags).to_be_like(["a", "b"])
+        expect(loaded.comments).to_length(1)
+        expect(loaded.comments[0].author).to_equal("heynemann")
+        expect(loaded.comments[0].likes).to_equal(1)
+
+    @gen_test
+    def test_can_modify_and_get_document(self):
+        class Job(Document):
+            __collection__ = "ModifyJob"
+            name = StringField()
+            status = StringField(default="pending")
+            attempts = IntField(default=0)
+
+        yield Job.objects.delete()
+        yield Job.objects.create(name="first")
+        yield Job.objects.create(name="second")
+
+        job = yield Job.objects.filter(status="pending").order_by("name", DESCENDING).modify(
+            set__status="running", inc__attempts=1
+        )
+        expect(job).to_be_instance_of(Job)
+        expect(job.name).to_equal("second")
+        expect(job.status).to_equal("running")
+        expect(job.attempts).to_equal(1)
+
+        job = yield Job.objects.filter(name="first").modify(set__status="running", new=False)
+        expect(job.name).to_equal("first")
+        expect(job.status).to_equal("pending")
+
+        job = yield Job.objects.filter(name="first").only("name").modify(inc__attempts=1)
+        expect(job.name).to_equal("first")
+        expect(job.is_partly_loaded).to_be_true()
+
+        job = yield Job.objects.filter(status="pending").modify(set__status="running")
+        expect(job).to_be_null()
+
+        job = yield Job.objects.filter(name="third").modify(set__status="done", upsert=True)
+        expect(job._id).not_to_be_null()
+        expect(job.status).to_equal("done")
+
+    @gen_test
+    def test_can_buffer_inserts(self):
+        class BufferedEvent(Document):
+            __write_buffer__ = {"batch_size": 3, "delay": 10}
+            name = StringField()
+
+        yield BufferedEvent.objects.delete()
+
+        events = yield [BufferedEvent.objects.create(name=str(number)) for number in range(3)]
+        for event in events:
+            expect(event._id).not_to_be_null()
+
+        pending = BufferedEvent(name="pending").save()
+        expect(pending.done()).to_be_false()
+
+        flushed = yield flush_write_buffers()
+        expect(flushed).to_equal(1)
+
+        event = yield pending
+        expect(event._id).not_to_be_null()
+
+        count = yield BufferedEvent.objects.count()
+        expect(count).to_equal(4)
+
+    @gen_test
+    def test_can_decode_documents_into_values(self):
+        class DecodedPost(Document):
+            __decode_values__ = True
+            title = StringField(db_field="t")
+            tags = ListField(StringField())
+
+        yield DecodedPost.objects.delete()
+        post = yield DecodedPost.objects.create(title="Hello", tags=["a"])
+
+        loaded = yield DecodedPost.objects.get(post._id)
+        expect(loaded.title).to_equal("Hello")
+
+        loaded.tags.append("b")
+        yield loaded.save()
+
+        posts = yield DecodedPost.objects.find_all()
+        expect(posts).to_length(1)
+        expect(posts[0].tags).to_be_like(["a", "b"])
+
+    @gen_test
+    def test_can_defer_fields(self):
+        class DeferredPost(Document):
+            title = StringField()
+            body = StringField(default="empty")
+            views = IntField(default=0)
+
+        yield DeferredPost.objects.delete()
+        yield DeferredPost.objects.create(title="a", body="first")
+        yield DeferredPost.objects.create(title="b", body="second")
+
+        posts = yield DeferredPost.objects.defer("body").order_by("title").find_all()
+        expect(posts[0].title).to_equal("a")
+        expect(posts[1].get_deferred_fields()).to_be_like(set(["body"]))
+
+        with expect.error_to_happen(LoadDeferredRequiredError):
+            posts[1].body
+
+        posts[0].views = 10
+        yield posts[0].save()
+
+        yield posts[1].load_deferred()
+        expect([post.body for post in posts]).to_equal(["first", "second"])
+        expect(posts[0].get_deferred_fields()).to_be_empty()
+        expect(posts[0].get_changed_fields()).to_be_empty()
+
+        post = yield DeferredPost.objects.get(title="a")
+        expect(post.body).to_equal("first")
+        expect(post.views).to_equal(10)
+
+    @gen_test
+    def test_pickled_documents_keep_their_deferred_fields(self):
+        yield CompactDeferredPost.objects.delete()
+        yield CompactDeferredPost.objects.create(title="a", body="first")
+
+        posts = yield CompactDeferredPost.objects.defer("body").find_all()
+        post = pickle.loads(pickle.dumps(posts[0]))
+
+        expect(post.get_deferred_fields()).to_be_like(set(["body"]))
+
+        with expect.error_to_happen(LoadDeferredRequiredError):
+            post.body
+
+        with expect.error_to_happen(PartlyLoadedDocumentError):
+            yield post.save(upsert=True)
+
+        yield post.load_deferred()
+        expect(post.body).to_equal("first")
+
+    @gen_test
+    def test_can_save_and_query_embedded_documents(self):
+        class OrderLine(EmbeddedDocument):
+            sku = StringField(db_field="s")
+            quantity = IntField(default=1)
+
+        class Order(Document):
+            __collection__ = "EmbeddedDocumentOrder"
+            number = StringField()
+            lines = ListField(EmbeddedDocumentField(OrderLine))
+
+        yield Order.objects.delete()
+        yield Order.objects.create(number="1", lines=[OrderLine(sku="a"), OrderLine(sku="b", quantity=2)])
+        yield Order.objects.create(number="2", lines=[OrderLine(sku="c")])
+
+        orders = yield Order.objects.filter(lines__sku="b").find_all()
+        expect(orders).to_length(1)
+        expect(orders[0].lines[1].quantity).to_equal(2)
+
+        orders[0].lines[1].quantity = 3
+        yield orders[0].save()
+
+        order = yield Order.objects.get(number="1")
+        expect([line.quantity for line in order.lines]).to_equal([1, 3])
+        expect(order.lines[0]).to_be_instance_of(OrderLine)
+
+    @gen_test
+    def test_session_returns_the_same_instance_of_each_document(self):
+        class SessionAuthor(Document):
+            name = StringField()
+            posts = IntField(default=0)
+
+        class SessionPost(Document):
+            __lazy__ = False
+            title = StringField()
+            author = ReferenceField(SessionAuthor)
+
+        yield SessionAuthor.objects.delete()
+        yield SessionPost.objects.delete()
+        author = yield SessionAuthor.objects.create(name="Bernardo")
+        yield SessionPost.objects.create(title="a", author=author)
+
+        @gen.coroutine
+        def handle_request():
+            loaded = yield SessionAuthor.objects.get(author._id)
+            authors = yield SessionAuthor.objects.find_all()
+            posts = yield SessionPost.objects.filter(title="a").find_all()
+            partly_loaded = yield SessionAuthor.objects.only("name").find_all()
+
+            # saved with the id of its author, so its reference is not loaded yet
+            saved = yield SessionPost.objects.create(title="b", author=author._id)
+            post = yield SessionPost.objects.get(saved._id)
+            expect(post is saved).to_be_true()
+            expect(post.author).to_equal(loaded)
+
+            expect(authors[0]).to_equal(loaded)
+            expect(posts[0].author).to_equal(loaded)
+            expect(partly_loaded[0] is loaded).to_be_false()
+
+            loaded.name = "Rafael"
+            modified = yield SessionAuthor.objects.filter(name="Bernardo").modify(inc__posts=1)
+            expect(modified is loaded).to_be_true()
+            expect(loaded.name).to_equal("Bernardo")
+            expect(loaded.posts).to_equal(1)
+
+            raise gen.Return(loaded)
+
+        loaded = yield Session().run(handle_request)
+        expect(loaded is author).to_be_false()
+
+        outside = yield SessionAuthor.objects.get(author._id)
+        expect(outside is loaded).to_be_false()
+
     def test_skip(self):
         User.objects.create(email="email@gmail.com", first_name="First", last_name="Last", callback=self.stop)
         self.wait()
@@ -964,6 +1231,34 @@ class TestDocument(AsyncTestCase):
 
         expect(loaded.item_size).to_equal(5)
 
+    def test_on_save_field_gets_the_creating_flag_of_full_saves(self):
+        flags = []
+
+        def record_creating(doc, creating):
+            flags.append(creating)
+            return len(doc.items)
+
+        class CreatingFlagDocument(Document):
+            items = ListField(IntField())
+            item_size = IntField(default=0, on_save=record_creating)
+
+        CreatingFlagDocument.objects.create(items=[1, 2, 3], callback=self.stop)
+        doc = self.wait()
+
+        CreatingFlagDocument.objects.get(doc._id, callback=self.stop)
+        loaded = self.wait()
+
+        loaded.items = [1, 2, 3, 4, 5]
+        loaded.save(callback=self.stop)
+        self.wait()
+
+        expect(flags).to_be_like([False, True])
+
+        CreatingFlagDocument.objects.get(doc._id, callback=self.stop)
+        loaded = self.wait()
+
+        expect(loaded.item_size).to_equal(5)
+
     def test_unique_field(self):
         class UniqueFieldDocument(Document):
             name = StringField(unique=True)
@@ -1001,6 +1296,62 @@ class TestDocument(AsyncTestCase):
         except UniqueKeyViolationError:
             assert False, "UniqueKeyViolationError should net be raised for unique sparse field with empty value"
 
+    @gen_test
+    def test_indexes_are_created_once_per_process(self):
+        class UniqueIndexOnceDocument(Document):
+            name = StringField(unique=True)
+
+        yield UniqueIndexOnceDocument.objects.delete()
+
+        yield UniqueIndexOnceDocument.objects.create(name="first")
+        indexes = index_registry.syncs[(UniqueIndexOnceDocument, "default")]
+        expect(indexes.result()).to_equal(1)
+
+        yield UniqueIndexOnceDocument.objects.create(name="second")
+        expect(index_registry.syncs[(UniqueIndexOnceDocument, "default")]).to_equal(indexes)
+
+        with expect.error_to_happen(UniqueKeyViolationError):
+            yield UniqueIndexOnceDocument.objects.create(name="first")
+
+    @gen_test
+    def test_sync_indexes(self):
+        class SyncIndexesDocument(Document):
+            name = StringField(unique=True)
+            email = StringField(unique=True, sparse=True)
+
+        created = yield sync_indexes([SyncIndexesDocument, User])
+        expect(created).to_equal(3)
+
+        created = yield SyncIndexesDocument.sync_indexes()
+        expect(created).to_equal(2)
+
+    @gen_test
+    def test_saving_loaded_document_only_sends_changed_fields(self):
+        class ChangedFieldsDocument(Document):
+            name = StringField()
+            email = StringField()
+            items = ListField(IntField())
+
+        yield ChangedFieldsDocument.objects.delete()
+
+        doc = yield ChangedFieldsDocument.objects.create(name="Bernardo", email="a@b.com", items=[1])
+
+        first = yield ChangedFieldsDocument.objects.get(doc._id)
+        second = yield ChangedFieldsDocument.objects.get(doc._id)
+
+        first.name = "Heynemann"
+        yield first.save()
+
+        second.email = "heynemann@gmail.com"
+        second.items.append(2)
+        yield second.save()
+
+        loaded = yield ChangedFieldsDocument.objects.get(doc._id)
+        expect(loaded.name).to_equal("Heynemann")
+        expect(loaded.email).to_equal("heynemann@gmail.com")
+        expect(loaded.items).to_be_like([1, 2])
+        expect(loaded.get_changed_fields()).to_be_empty()
+
     def test_json_field_with_document(self):
         class JSONFieldDocument(Document):
             field = JsonField()
@@ -1281,6 +1632,133 @@ class TestDocument(AsyncTestCase):
         expect(base.list_val).to_length(3)
         expect(base.list_val[0]).to_be_instance_of(Ref)
 
+    @gen_test
+    def test_list_field_with_reference_field_keeps_order(self):
+        class Ref(Document):
+            __collection__ = 'ref'
+            val = StringField()
+
+        class Base(Document):
+            __collection__ = 'base'
+            __lazy__ = False
+            ref = ReferenceField(reference_document_type=Ref)
+            list_val = ListField(ReferenceField(reference_document_type=Ref))
+
+        yield Ref.objects.delete()
+        yield Base.objects.delete()
+
+        ref1 = yield Ref.objects.create(val="v1")
+        ref2 = yield Ref.objects.create(val="v2")
+        ref3 = yield Ref.objects.create(val="v3")
+
+        base = yield Base.objects.create(ref=ref2, list_val=[ref3, ref1, ref3, ref2])
+
+        base = yield Base.objects.get(base._id)
+
+        expect([item.val for item in base.list_val]).to_be_like(["v3", "v1", "v3", "v2"])
+        expect(base.list_val[0]).to_equal(base.list_val[2])
+        expect(base.ref.val).to_equal("v2")
+
+    @gen_test
+    def test_load_references_queries_each_referenced_type_once(self):
+        class ManyReferences(Document):
+            __collection__ = "ManyReferences"
+            first = ReferenceField(User)
+            second = ReferenceField(User)
+            others = ListField(ReferenceField(User))
+
+        yield ManyReferences.objects.delete()
+
+        users = []
+        for index in range(4):
+            user = yield User.objects.create(email="user%d@gmail.com" % index)
+            users.append(user)
+
+        document = yield ManyReferences.objects.create(
+            first=users[0], second=users[1], others=[users[2], users[3], users[0]]
+        )
+
+        loaded = yield ManyReferences.objects.get(document._id)
+
+        queries = self.record_queries(User)
+        result = yield loaded.load_references()
+
+        expect(result['loaded_reference_count']).to_equal(5)
+        expect(queries).to_length(1)
+        expect(loaded.first.email).to_equal("user0@gmail.com")
+        expect(loaded.second.email).to_equal("user1@gmail.com")
+        expect([user.email for user in loaded.others]).to_be_like([
+            "user2@gmail.com", "user3@gmail.com", "user0@gmail.com"
+        ])
+
+        loaded = yield ManyReferences.objects.only("first.email", "second.email").get(document._id)
+
+        del queries[:]
+        yield loaded.load_references()
+
+        expect(queries).to_length(1)
+        expect(loaded.first.email).to_equal("user0@gmail.com")
+        expect(loaded.second.email).to_equal("user1@gmail.com")
+
+    @gen_test
+    def test_find_all_shares_references_between_documents(self):
+        user = yield User.objects.create(email="heynemann@gmail.com", first_name="Bernardo", last_name="Heynemann")
+
+        for index in range(5):
+            yield CommentNotLazy.objects.create(text="Comment %d" % index, user=user)
+
+        queries = self.record_queries(User)
+        comments = yield CommentNotLazy.objects.find_all()
+
+        expect(comments).to_length(5)
+        expect(queries).to_length(1)
+        for comment in comments:
+            expect(comment.user).to_be_instance_of(User)
+            expect(comment.user._id).to_equal(user._id)
+            expect(comment.user).to_equal(comments[0].user)
+
+    @gen_test
+    def test_find_all_loads_the_references_of_a_page_with_one_query(self):
+        users = []
+        for index in range(3):
+            user = yield User.objects.create(email="user%d@gmail.com" % index)
+            users.append(user)
+
+        for index in range(6):
+            yield CommentNotLazy.objects.create(text="Comment %d" % index, user=users[index % 3])
+
+        queries = self.record_queries(User)
+        comments = yield CommentNotLazy.objects.order_by("text").find_all()
+
+        expect(queries).to_length(1)
+        expect([comment.user.email for comment in comments]).to_be_like([
+            "user0@gmail.com", "user1@gmail.com", "user2@gmail.com",
+            "user0@gmail.com", "user1@gmail.com", "user2@gmail.com",
+        ])
+
+        del queries[:]
+        comments = yield CommentNotLazy.objects.only("text", "user.email").find_all()
+
+        expect(comments).to_length(6)
+        expect(queries).to_length(1)
+        expect(set(comment.user.email for comment in comments)).to_length(3)
+
+    @gen_test
+    def test_load_references_in_list_of_embedded_documents(self):
+        user = yield User.objects.create(email="heynemann@gmail.com", first_name="Bernardo", last_name="Heynemann")
+
+        post = yield Post.objects.create(title="Testing post", body="Testing post body")
+        post.comments.append(Comment(text="First comment", user=user))
+        post.comments.append(Comment(text="Second comment", user=user))
+        yield post.save()
+
+        loaded_post = yield Post.objects.get(post._id)
+        result = yield loaded_post.load_references()
+
+        expect(result['loaded_reference_count']).to_equal(2)
+        expect(loaded_post.comments[0].user.email).to_equal("heynemann@gmail.com")
+        expect(loaded_post.comments[1].user.email).to_equal("heynemann@gmail.com")
+
     def test_can_create_new_instance_with_id(self):
         user = EmployeeWithId(id="12345", emp_number="mynumber")
         user.save(callback=self.stop)
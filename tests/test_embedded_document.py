@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pickle
+
+from preggy import expect
+
+from motorengine import (
+    Document, EmbeddedDocument, StringField, IntField, ListField, EmbeddedDocumentField
+)
+from motorengine.errors import InvalidDocumentError
+from tests import AsyncTestCase
+
+
+class LineItem(EmbeddedDocument):
+    sku = StringField(db_field="s", required=True)
+    quantity = IntField(default=1)
+
+
+class Order(Document):
+    number = StringField()
+    item = EmbeddedDocumentField(LineItem)
+    items = ListField(EmbeddedDocumentField(LineItem))
+
+
+class TestEmbeddedDocument(AsyncTestCase):
+    def test_embedded_documents_have_no_document_machinery(self):
+        item = LineItem(sku="a")
+
+        expect(hasattr(item, "__dict__")).to_be_false()
+        expect(hasattr(item, "_id")).to_be_false()
+        expect(hasattr(LineItem, "objects")).to_be_false()
+        expect(hasattr(item, "save")).to_be_false()
+
+    def test_embedded_document_values(self):
+        item = LineItem(sku="a", note="fragile")
+
+        expect(item.sku).to_equal("a")
+        expect(item.quantity).to_equal(1)
+        expect(item.note).to_equal("fragile")
+        expect(item.to_son()).to_be_like({"s": "a", "quantity": 1, "_note": "fragile"})
+
+        item.quantity = 2
+        expect(item.quantity).to_equal(2)
+
+    def test_embedded_documents_are_validated_by_their_document(self):
+        order = Order(item=LineItem(), items=[LineItem(sku="a")])
+
+        with expect.error_to_happen(InvalidDocumentError, message="Field 'sku' is required."):
+            order.validate()
+
+        order.item.sku = "b"
+        expect(order.validate()).to_be_true()
+
+    def test_from_son_and_change_tracking(self):
+        order = Order.from_son({"_id": 1, "item": {"s": "a"}, "items": [{"s": "b", "quantity": 3}]})
+
+        expect(order.item).to_be_instance_of(LineItem)
+        expect(order.item.quantity).to_equal(1)
+        expect(order.items[0].sku).to_equal("b")
+        expect(order.get_changed_fields()).to_be_empty()
+
+        order.items[0].quantity = 4
+
+        expect(order.items[0].get_changed_fields()).to_be_like(set(["quantity"]))
+        expect(order.get_update_for_changes(order.get_changed_fields())).to_be_like({
+            "$set": {"items": [{"s": "b", "quantity": 4}]}
+        })
+
+    def test_can_pickle_embedded_documents(self):
+        item = pickle.loads(pickle.dumps(LineItem.from_son({"s": "a", "quantity": 2})))
+
+        expect(item.sku).to_equal("a")
+        expect(item.quantity).to_equal(2)
+        expect(item.get_changed_fields()).to_be_empty()
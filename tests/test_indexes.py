@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from preggy import expect
+
+from motorengine import Document, StringField, DateTimeField, EmbeddedDocumentField
+from motorengine.indexes import get_index_models, get_missing_index_models, get_index_changes
+from tests import AsyncTestCase
+
+
+class Address(Document):
+    city = StringField(db_field="c")
+
+
+class Event(Document):
+    __indexes__ = [
+        ("user", "-created_at"),
+        {"fields": "created_at", "expireAfterSeconds": 3600},
+        {"fields": ["kind", "user"], "partialFilterExpression": {"kind": {"$exists": True}}, "background": True},
+        "address.city",
+        {"fields": [("user", "hashed")], "name": "user_hash"},
+    ]
+
+    user = StringField(db_field="u")
+    created_at = DateTimeField()
+    kind = StringField(unique=True)
+    address = EmbeddedDocumentField(Address)
+
+
+class InvalidIndexEvent(Document):
+    __indexes__ = ["invalid"]
+
+
+class TestIndexes(AsyncTestCase):
+    def setUp(self):
+        super(TestIndexes, self).setUp(auto_connect=False)
+
+    def test_get_index_models(self):
+        indexes = [model.document for model in get_index_models(Event)]
+
+        expect(indexes).to_length(6)
+        expect(indexes[0]).to_be_like({"name": "kind_1", "key": {"kind": 1}, "unique": True, "sparse": False})
+        expect(list(indexes[1]["key"].items())).to_be_like([("u", 1), ("created_at", -1)])
+        expect(indexes[2]["expireAfterSeconds"]).to_equal(3600)
+        expect(indexes[3]["partialFilterExpression"]).to_be_like({"kind": {"$exists": True}})
+        expect(indexes[3]["background"]).to_be_true()
+        expect(indexes[4]["name"]).to_equal("address.c_1")
+        expect(indexes[5]).to_be_like({"name": "user_hash", "key": {"u": "hashed"}})
+
+    def test_get_index_models_with_invalid_field(self):
+        msg = "Invalid index field 'invalid': Field not found in 'InvalidIndexEvent'."
+        with expect.error_to_happen(ValueError, message=msg):
+            get_index_models(InvalidIndexEvent)
+
+    def test_get_missing_index_models(self):
+        index_information = {
+            "_id_": {"key": [("_id", 1)]},
+            "kind_1": {"key": [("kind", 1)], "unique": True},
+            "u_1_created_at_-1": {"key": [("u", 1), ("created_at", -1)]},
+            "created_at_1": {"key": [("created_at", 1)], "expireAfterSeconds": 60},
+        }
+
+        missing = [model.document["name"] for model in get_missing_index_models(get_index_models(Event), index_information)]
+
+        expect(missing).to_be_like(["created_at_1", "kind_1_u_1", "address.c_1", "user_hash"])
+
+    def test_get_index_changes(self):
+        index_information = {
+            "_id_": {"key": [("_id", 1)]},
+            "kind_1": {"key": [("kind", 1)], "unique": True},
+            "u_1_created_at_-1": {"key": [("u", 1), ("created_at", -1)]},
+            "created_at_1": {"key": [("created_at", 1)], "expireAfterSeconds": 60},
+            "kind_1_u_1": {"key": [("kind", 1), ("u", 1)]},
+        }
+
+        updates, drops, creates = get_index_changes(get_index_models(Event), index_information)
+
+        expect(updates).to_length(1)
+        expect(list(updates[0]["keyPattern"].items())).to_be_like([("created_at", 1)])
+        expect(updates[0]["expireAfterSeconds"]).to_equal(3600)
+        expect(drops).to_be_like(["kind_1_u_1"])
+        expect([model.document["name"] for model in creates]).to_be_like(["kind_1_u_1", "address.c_1", "user_hash"])
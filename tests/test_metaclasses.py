@@ -0,0 +1,411 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from bson import BSON
+from bson.codec_options import CodecOptions
+from bson.objectid import ObjectId
+from preggy import expect
+
+from motorengine import (
+    Document, StringField, IntField, ListField, EmbeddedDocumentField, ReferenceField, JsonField
+)
+from motorengine.errors import InvalidDocumentError, LoadReferencesRequiredError
+from motorengine.values import DecodedSon, DecodedValues, LazyEmbeddedDocument, LazyList
+from tests import AsyncTestCase
+
+
+class Address(Document):
+    street = StringField(db_field="st")
+
+
+class User(Document):
+    name = StringField(db_field="user_name", default="Bernardo")
+    age = IntField(default=lambda: 18)
+    address = EmbeddedDocumentField(Address)
+    tags = ListField(StringField())
+    friend = ReferenceField("tests.test_metaclasses.User")
+
+
+class UserWithInit(User):
+    def __init__(self, *args, **kw):
+        super(UserWithInit, self).__init__(*args, **kw)
+        self.initialized = True
+
+
+class UserWithValidate(User):
+    def validate(self):
+        return False
+
+
+class DecodedUser(User):
+    __decode_values__ = True
+
+
+class UserWithAddresses(User):
+    addresses = ListField(EmbeddedDocumentField(Address), db_field="addrs")
+
+
+class TestHydrationPlan(AsyncTestCase):
+    def test_hydration_plan_maps_db_fields_to_names(self):
+        expect(User._hydration_plan).to_include("user_name")
+        expect(User._hydration_plan["user_name"][0]).to_equal("name")
+        expect(User._hydration_plan["address"][0]).to_equal("address")
+
+    def test_hydration_plan_skips_identity_converters(self):
+        expect(User._hydration_plan["user_name"][1]).to_be_null()
+        expect(User._hydration_plan["friend"][1]).to_be_null()
+        expect(User._hydration_plan["address"][1]).not_to_be_null()
+        expect(User._hydration_plan["tags"][1]).not_to_be_null()
+
+    def test_from_son_applies_defaults_only_for_missing_keys(self):
+        user = User.from_son({"_id": 1, "user_name": "Heynemann", "address": {"st": "Infinite Loop"}})
+
+        expect(user._id).to_equal(1)
+        expect(user.name).to_equal("Heynemann")
+        expect(user.age).to_equal(18)
+        expect(user.tags).to_be_like([])
+        expect(user.address).to_be_instance_of(Address)
+        expect(user.address.street).to_equal("Infinite Loop")
+        expect(user.is_partly_loaded).to_be_false()
+
+    def test_dynamic_keys_do_not_scan_the_fields(self):
+        scanned = []
+
+        class ScanningUser(User):
+            @classmethod
+            def get_field_by_db_name(cls, name):
+                scanned.append(name)
+                return super(ScanningUser, cls).get_field_by_db_name(name)
+
+        son = {"_id": 1, "user_name": "Heynemann", "_nickname": "heynemann", "karma": 10}
+
+        user = ScanningUser.from_son(dict(son))
+        values = ScanningUser.get_values_from_son(dict(son))
+        decoded = ScanningUser.from_son(DecodedSon(son))
+
+        expect(scanned).to_be_empty()
+        expect(user.nickname).to_equal("heynemann")
+        expect(user.karma).to_equal(10)
+        expect(values["nickname"]).to_equal("heynemann")
+        expect(decoded.karma).to_equal(10)
+
+    def test_from_son_calls_custom_init(self):
+        user = UserWithInit.from_son({"_id": 1, "user_name": "Heynemann"}, _is_partly_loaded=True)
+
+        expect(user.initialized).to_be_true()
+        expect(user.name).to_equal("Heynemann")
+        expect(user.is_partly_loaded).to_be_true()
+
+
+class TestSerializationPlan(AsyncTestCase):
+    def test_serialization_plan_skips_identity_converters(self):
+        plan = dict((item[0], item) for item in User._serialization_plan)
+
+        expect(plan["name"][1]).to_equal("user_name")
+        expect(plan["name"][2]).to_be_null()
+        expect(plan["name"][3]).to_be_null()
+        expect(plan["address"][3]).not_to_be_null()
+
+    def test_to_son_uses_db_fields(self):
+        user = User(name="Heynemann", address=Address(street="Infinite Loop"))
+
+        expect(user.to_son()).to_be_like({
+            "user_name": "Heynemann",
+            "age": 18,
+            "address": {"st": "Infinite Loop"},
+            "tags": [],
+            "friend": None,
+        })
+
+    def test_validate_and_to_son(self):
+        user = User(name="Heynemann")
+
+        expect(user.validate_and_to_son()).to_be_like(user.to_son())
+
+    def test_validate_and_to_son_raises_for_invalid_document(self):
+        user = User(name=10)
+
+        with expect.error_to_happen(InvalidDocumentError, message="Field 'name' must be valid."):
+            user.validate_and_to_son()
+
+    def test_validate_and_to_son_uses_custom_validate(self):
+        user = UserWithValidate(name="Heynemann")
+
+        expect(user.validate_and_to_son()).to_be_null()
+
+
+class TestFieldDescriptors(AsyncTestCase):
+    def test_class_access_returns_field(self):
+        expect(User.name).to_be_instance_of(StringField)
+        expect(User.friend).to_be_instance_of(ReferenceField)
+
+    def test_instance_access_returns_value(self):
+        user = User(name="Heynemann")
+
+        expect(user.name).to_equal("Heynemann")
+
+        user.name = "Bernardo"
+        expect(user.name).to_equal("Bernardo")
+        expect(user._values["name"]).to_equal("Bernardo")
+
+    def test_reference_access_before_loading_references_raises(self):
+        user = User.from_son({"_id": 1, "friend": ObjectId()})
+
+        with expect.error_to_happen(LoadReferencesRequiredError):
+            user.friend
+
+    def test_dynamic_fields_are_accessible(self):
+        user = UserWithValidate(nickname="heynemann")
+
+        expect(user.nickname).to_equal("heynemann")
+
+    def test_missing_attribute_raises_attribute_error(self):
+        user = User()
+
+        expect(hasattr(user, "missing_attribute")).to_be_false()
+
+
+class CompactUser(Document):
+    __compact__ = True
+
+    name = StringField(db_field="user_name", default="Bernardo")
+    age = IntField()
+    address = EmbeddedDocumentField(Address)
+
+
+class CompactUserWithEmail(CompactUser):
+    email = StringField()
+
+
+class CompactUserWithNickname(CompactUser):
+    pass
+
+
+class TestCompactDocuments(AsyncTestCase):
+    def test_compact_document_has_no_instance_dict(self):
+        user = CompactUser(name="Heynemann")
+
+        expect(hasattr(user, "__dict__")).to_be_false()
+        expect(CompactUser.__slots__).to_include("slot__name")
+        expect(CompactUserWithEmail.__slots__).to_equal(("slot__email", ))
+
+    def test_compact_document_values(self):
+        user = CompactUserWithEmail(name="Heynemann", email="heynemann@gmail.com")
+
+        expect(user.name).to_equal("Heynemann")
+        expect(user.age).to_be_null()
+        expect(user._values["email"]).to_equal("heynemann@gmail.com")
+
+        user.age = 30
+        expect(user.age).to_equal(30)
+        expect(dict(user._values)).to_be_like({
+            "name": "Heynemann", "age": 30, "address": None, "email": "heynemann@gmail.com"
+        })
+
+    def test_compact_document_from_son_and_to_son(self):
+        user = CompactUser.from_son({"_id": 1, "user_name": "Heynemann", "address": {"st": "Infinite Loop"}})
+
+        expect(user._id).to_equal(1)
+        expect(user.address.street).to_equal("Infinite Loop")
+        expect(user._dynamic_values).to_be_null()
+        expect(user.to_son()).to_be_like({
+            "user_name": "Heynemann", "age": None, "address": {"st": "Infinite Loop"}
+        })
+
+    def test_compact_document_dynamic_fields_use_overflow_dict(self):
+        user = CompactUserWithNickname.from_son({"_id": 1, "user_name": "Heynemann", "nickname": "heynemann"})
+
+        expect(user.nickname).to_equal("heynemann")
+        expect(user._dynamic_values).to_be_like({"nickname": "heynemann"})
+
+
+class TestDynamicFields(AsyncTestCase):
+    def test_dynamic_fields_do_not_change_the_document_class(self):
+        fields = sorted(User._fields)
+
+        user = User(nickname="heynemann")
+        user.city = "Sao Paulo"
+        loaded_user = User.from_son({"_id": 1, "user_name": "Heynemann", "_country": "Brazil"})
+
+        expect(sorted(User._fields)).to_equal(fields)
+        expect(hasattr(User(), "nickname")).to_be_false()
+
+        expect(user.nickname).to_equal("heynemann")
+        expect(user.city).to_equal("Sao Paulo")
+        expect(loaded_user.country).to_equal("Brazil")
+
+    def test_dynamic_fields_are_serialized(self):
+        user = User(name="Heynemann", nickname="heynemann")
+
+        expect(user.to_son()).to_include("_nickname")
+        expect(user.to_son()["_nickname"]).to_equal("heynemann")
+        expect(user.get_dynamic_fields()[0][0]).to_equal("nickname")
+        expect(user.get_field_value("nickname")).to_equal("heynemann")
+
+    def test_dynamic_field_instances_are_shared(self):
+        first = User(nickname="heynemann").get_dynamic_fields()[0][1]
+        second = User(nickname="bernardo").get_dynamic_fields()[0][1]
+
+        expect(first).to_equal(second)
+        expect(first.db_field).to_equal("_nickname")
+
+
+class TestChangeTracking(AsyncTestCase):
+    def test_new_documents_are_not_tracked(self):
+        user = User(name="Heynemann")
+
+        expect(user.get_changed_fields()).to_be_null()
+        expect(user.has_changed()).to_be_true()
+
+    def test_loaded_documents_with_missing_lists_and_json_values_are_unchanged(self):
+        class Profile(Document):
+            tags = ListField(StringField())
+            settings = JsonField()
+
+        profile = Profile.from_son({"_id": 1, "settings": '{"theme": {"color": "blue"}}'})
+
+        expect(profile.get_changed_fields()).to_be_empty()
+        expect(profile.has_changed()).to_be_false()
+
+        profile.settings["theme"]["color"] = "red"
+        expect(profile.get_changed_fields()).to_be_like(set(["settings"]))
+
+        profile.clear_changes()
+        profile.tags.append("a")
+        expect(profile.get_changed_fields()).to_be_like(set(["tags"]))
+
+    def test_loaded_documents_track_changed_fields(self):
+        user = User.from_son({"_id": 1, "user_name": "Heynemann", "age": 30, "address": {"st": "Infinite Loop"}, "tags": ["a"]})
+
+        expect(user.get_changed_fields()).to_be_empty()
+
+        user.age = 31
+        user.tags.append("b")
+        user.address.street = "Other Street"
+        user.nickname = "heynemann"
+
+        expect(user.get_changed_fields()).to_be_like(set(["age", "tags", "address", "nickname"]))
+        expect(user.get_update_for_changes(["age", "tags", "address", "nickname"])).to_be_like({
+            "$set": {"age": 31, "tags": ["a", "b"], "address": {"st": "Other Street"}, "_nickname": "heynemann"}
+        })
+
+        user.clear_changes()
+        expect(user.get_changed_fields()).to_be_empty()
+        expect(user.address.get_changed_fields()).to_be_empty()
+
+    def test_validate_changes_only_validates_changed_fields(self):
+        user = User.from_son({"_id": 1, "user_name": 10})
+
+        expect(user.validate_changes(["age"])).to_be_true()
+
+        with expect.error_to_happen(InvalidDocumentError, message="Field 'name' must be valid."):
+            user.validate_changes(["name"])
+
+
+class TestDecodedValues(AsyncTestCase):
+    def test_decoded_values_are_used_as_document_values(self):
+        son = DecodedSon({"_id": 1, "user_name": "Heynemann", "address": {"st": "Infinite Loop"}, "_nickname": "heynemann"})
+
+        user = DecodedUser.from_son(son)
+
+        expect(user._values is son).to_be_true()
+        expect(son).to_be_instance_of(DecodedValues)
+        expect(user._id).to_equal(1)
+        expect(user.name).to_equal("Heynemann")
+        expect(user.nickname).to_equal("heynemann")
+        expect(user.age).to_equal(18)
+        expect(son.converters).to_include("address")
+        expect(dict.get(son, "address")).to_be_like({"st": "Infinite Loop"})
+
+        expect(user.address).to_be_instance_of(Address)
+        expect(user.address.street).to_equal("Infinite Loop")
+        expect(son.converters).not_to_include("address")
+
+    def test_decoded_values_are_converted_when_iterated(self):
+        user = DecodedUser.from_son(DecodedSon({"_id": 1, "address": {"st": "Infinite Loop"}, "tags": ["a"]}))
+
+        expect(user.to_son()["address"]).to_be_like({"st": "Infinite Loop"})
+        expect(user.get_changed_fields()).to_be_empty()
+
+    def test_subdocuments_are_decoded_as_plain_dicts(self):
+        codec_options = CodecOptions(document_class=DecodedSon)
+        son = BSON.encode({"_id": 1, "address": {"st": "Infinite Loop"}, "data": {"a": {"b": 1}}}).decode(codec_options)
+
+        user = DecodedUser.from_son(son)
+
+        expect(type(user._values)).to_equal(DecodedValues)
+        expect(type(dict.get(user._values, "address"))).to_equal(DecodedSon)
+        expect(type(user.data)).to_equal(DecodedSon)
+        expect(user.data).to_be_like({"a": {"b": 1}})
+        expect(user.address.street).to_equal("Infinite Loop")
+
+    def test_only_opted_in_classes_use_decoded_values(self):
+        son = DecodedSon({"_id": 1, "user_name": "Heynemann"})
+
+        expect(User.from_son(son)._values is son).to_be_false()
+        expect(User._decodes_values).to_be_false()
+        expect(DecodedUser._decodes_values).to_be_true()
+
+
+class TestLazyHydration(AsyncTestCase):
+    def test_embedded_documents_are_hydrated_when_first_read(self):
+        user = User.from_son({"_id": 1, "address": {"st": "Infinite Loop"}, "tags": []})
+
+        expect(user._values["address"]).to_be_instance_of(LazyEmbeddedDocument)
+        expect(user.to_son()["address"]).to_be_like({"st": "Infinite Loop"})
+        expect(user.validate()).to_be_true()
+
+        expect(user.address).to_be_instance_of(Address)
+        expect(user.address.street).to_equal("Infinite Loop")
+        expect(user._values["address"] is user.address).to_be_true()
+        expect(user.get_changed_fields()).to_be_empty()
+
+    def test_list_items_are_converted_when_first_read(self):
+        user = UserWithAddresses.from_son({"_id": 1, "addrs": [{"st": "First"}, {"st": "Second"}, {"st": "Third"}], "tags": []})
+
+        expect(isinstance(user.addresses, LazyList)).to_be_true()
+        expect(len(user.addresses)).to_equal(3)
+        expect(user.addresses.loaded).to_equal(bytearray(3))
+
+        expect(user.addresses[1].street).to_equal("Second")
+        expect(user.addresses.loaded).to_equal(bytearray(b"\x00\x01\x00"))
+        expect(user.get_changed_fields()).to_be_empty()
+
+        user.addresses[1].street = "Other"
+
+        expect(user.get_changed_fields()).to_be_like(set(["addresses"]))
+        expect(user.get_update_for_changes(["addresses"])).to_be_like({
+            "$set": {"addrs": [{"st": "First"}, {"st": "Other"}, {"st": "Third"}]}
+        })
+
+        expect([address.street for address in user.addresses]).to_equal(["First", "Other", "Third"])
+        expect(user.addresses.loaded).to_be_null()
+        expect(all(isinstance(address, Address) for address in list.__iter__(user.addresses))).to_be_true()
+
+    def test_iterating_a_list_converts_only_the_items_read(self):
+        user = UserWithAddresses.from_son({
+            "_id": 1, "addrs": [{"st": str(number)} for number in range(1000)], "tags": []
+        })
+
+        first = next(iter(user.addresses))
+
+        expect(first).to_be_instance_of(Address)
+        expect(first.street).to_equal("0")
+        expect(sum(user.addresses.loaded)).to_equal(1)
+        expect(list.__getitem__(user.addresses, 1)).to_be_like({"st": "1"})
+
+        for address in user.addresses:
+            if address.street == "2":
+                break
+
+        expect(user.addresses.loaded[:4]).to_equal(bytearray(b"\x01\x01\x01\x00"))
+        expect(sum(user.addresses.loaded)).to_equal(3)
+
+    def test_list_items_are_converted_before_changing_the_list(self):
+        user = UserWithAddresses.from_son({"_id": 1, "addrs": [{"st": "First"}, {"st": "Second"}], "tags": []})
+
+        user.addresses.insert(0, Address(street="Zero"))
+
+        expect(user.addresses.loaded).to_be_null()
+        expect([address.street for address in user.addresses]).to_equal(["Zero", "First", "Second"])
+        expect(user.get_changed_fields()).to_be_like(set(["addresses"]))
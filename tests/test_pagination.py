@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+
+from bson.raw_bson import RawBSONDocument
+from preggy import expect
+from tornado.testing import gen_test
+
+from motorengine import (
+    Document, StringField, IntField, DESCENDING
+)
+from tests import AsyncTestCase
+
+
+class User(Document):
+    __collection__ = "UserPagination"
+    name = StringField(db_field="user_name")
+    number = IntField()
+    group = IntField()
+
+
+class TestPaginateAfter(AsyncTestCase):
+    def setUp(self):
+        super(TestPaginateAfter, self).setUp()
+        self.drop_coll("UserPagination")
+
+    @gen_test
+    def test_can_paginate_over_all_documents(self):
+        yield User.objects.bulk_insert([
+            User(name="%03d" % number, number=number, group=number % 3)
+            for number in range(45)
+        ])
+
+        page = yield User.objects.order_by(User.number).paginate_after(page_size=10)
+
+        numbers = [user.number for user in page.documents]
+        while page.next_token is not None:
+            page = yield User.objects.order_by(User.number).paginate_after(page.next_token, page_size=10)
+            numbers.extend([user.number for user in page.documents])
+
+        expect(numbers).to_be_like(list(range(45)))
+        expect(page.documents).to_length(5)
+
+    @gen_test
+    def test_can_paginate_with_filters_projection_and_repeated_sort_values(self):
+        yield User.objects.bulk_insert([
+            User(name="%03d" % number, number=number, group=number % 3)
+            for number in range(30)
+        ])
+
+        def get_queryset():
+            return User.objects.filter(number__gte=10).order_by('group', DESCENDING).only('number')
+
+        page = yield get_queryset().paginate_after(page_size=4)
+
+        users = list(page.documents)
+        while page.next_token is not None:
+            page = yield get_queryset().paginate_after(page.next_token, page_size=4)
+            users.extend(page.documents)
+
+        expect(users).to_length(20)
+        expect([user.group for user in users]).to_be_like(sorted([number % 3 for number in range(10, 30)], reverse=True))
+        expect(len(set([user._id for user in users]))).to_equal(20)
+
+    @gen_test
+    def test_can_paginate_after_document(self):
+        users = [
+            User(name="%03d" % number, number=number, group=0)
+            for number in range(10)
+        ]
+        yield User.objects.bulk_insert(users)
+
+        page = yield User.objects.order_by('name').paginate_after(users[3], page_size=3)
+
+        expect([user.number for user in page.documents]).to_be_like([4, 5, 6])
+        expect(page.next_token).not_to_be_null()
+
+    @gen_test
+    def test_can_paginate_raw_bson_documents(self):
+        yield User.objects.bulk_insert([
+            User(name="%03d" % number, number=number, group=0)
+            for number in range(5)
+        ])
+
+        page = yield User.objects.order_by('name').as_raw_bson().paginate_after(page_size=3)
+        expect(page.documents[0]).to_be_instance_of(RawBSONDocument)
+
+        page = yield User.objects.order_by('name').as_raw_bson().paginate_after(page.next_token, page_size=3)
+        expect([document["user_name"] for document in page.documents]).to_be_like(["003", "004"])
+
+    def test_cant_paginate_with_invalid_token(self):
+        token = "AAAA"
+        try:
+            User.objects.order_by('name').paginate_after(token, page_size=3)
+        except ValueError:
+            err = sys.exc_info()[1]
+            expect(str(err)).to_include("Invalid continuation token")
+        else:
+            assert False, "Should not have gotten this far"
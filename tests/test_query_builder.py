@@ -9,6 +9,7 @@ from motorengine import (
     URLField, DateTimeField, Q, EmbeddedDocumentField
 )
 from motorengine.query_builder.node import QCombination
+from motorengine.query_builder.transform import query_cache, transform_update
 from tests import AsyncTestCase
 
 
@@ -257,3 +258,47 @@ class TestQueryBuilder(AsyncTestCase):
 
         expect(users).to_length(1)
         expect(users[0].first_name).to_equal("Bernardo")
+
+    def test_reuses_compiled_query_templates(self):
+        query_cache.clear()
+
+        query_result = Q(first_name="Test", embedded__test__exists=True).to_query(User)
+        expect(query_result).to_be_like({"whatever": "Test", "embedded_document.other": {"$exists": True}})
+        expect(query_cache.stats).to_be_like({"hits": 0, "misses": 1, "size": 1})
+
+        query_result = Q(embedded__test__exists=False, first_name="Else").to_query(User)
+        expect(query_result).to_be_like({"whatever": "Else", "embedded_document.other": {"$exists": False}})
+        expect(query_cache.stats).to_be_like({"hits": 1, "misses": 1, "size": 1})
+
+        query_result = Q(first_name="Test").to_query(EmbeddedDocument2)
+        expect(query_result).to_be_like({"_first_name": "Test"})
+        expect(query_cache.stats).to_be_like({"hits": 1, "misses": 2, "size": 2})
+
+    def test_transforms_update_operators(self):
+        update = transform_update(
+            User, set__first_name="Test", inc__numbers__0=2, push__numbers=3, unset__embedded=True
+        )
+
+        expect(update).to_be_like({
+            "$set": {"whatever": "Test"},
+            "$inc": {"numbers.0": 2},
+            "$push": {"numbers": 3},
+            "$unset": {"embedded_document": ""},
+        })
+
+        update = transform_update(User, embedded__test="Test", add_to_set__numbers=[1, 2], dec__numbers__S=1)
+
+        expect(update).to_be_like({
+            "$set": {"embedded_document.other": "Test"},
+            "$addToSet": {"numbers": {"$each": [1, 2]}},
+            "$inc": {"numbers.$": -1},
+        })
+
+    def test_transform_update_fails_for_unknown_fields(self):
+        msg = "Invalid update 'inc__viewz': Field not found in 'User'."
+        with expect.error_to_happen(ValueError, message=msg):
+            transform_update(User, inc__viewz=1)
+
+        msg = "Invalid update 'set__embedded__invalid': Field not found in 'User'."
+        with expect.error_to_happen(ValueError, message=msg):
+            transform_update(User, set__embedded__invalid="Test")
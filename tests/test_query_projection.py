@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 
 
+from bson import json_util
+from bson.raw_bson import RawBSONDocument
 from preggy import expect
 from tornado.testing import gen_test
 
@@ -265,6 +267,18 @@ class TestQueryProjection(AsyncTestCase):
         expect(user.embedded.test).to_be_null()
         expect(user.email).to_be_null()
 
+    def test_can_combine_defer_with_only_and_exclude(self):
+        expect(User.objects.defer("last_name").get_projection()).to_be_like({"last_name": 0})
+        expect(User.objects.defer("last_name").exclude("email").get_projection()).to_be_like({
+            "last_name": 0, "email": 0
+        })
+        expect(User.objects.only("first_name", "last_name").defer(User.last_name).get_projection()).to_be_like({
+            "whatever": 1
+        })
+
+        with expect.error_to_happen(ValueError, message="Invalid field 'embedded.test': Field not found in 'User'."):
+            User.objects.defer("embedded.test")
+
     def test_only_failed_with_wrong_field_name(self):
         with expect.error_to_happen(
             ValueError,
@@ -570,3 +584,61 @@ class TestQueryProjection(AsyncTestCase):
             )
         ):
             User.objects.save(users[0], callback=self.stop)
+
+    def test_can_get_raw_values(self):
+        Post.objects.as_raw().find_all(callback=self.stop)
+        posts = self.wait()
+
+        expect(posts).to_length(1)
+        expect(posts[0]["text"]).to_equal("post1 text")
+        expect(posts[0]["comments"][0]).to_be_like({"title": "comment1", "text": "comment1 text"})
+        expect(posts[0]["_id"]).not_to_be_null()
+
+        User.objects.as_raw(convert=True).get(first_name="Someone", callback=self.stop)
+        user = self.wait()
+
+        expect(user["embedded"]).to_be_instance_of(EmbeddedDocument)
+        expect(user["embedded"].embedded2.test).to_equal("test22")
+
+    def test_can_get_values_of_fields(self):
+        User.objects.values(User.first_name, "index").order_by(User.index)\
+            .find_all(callback=self.stop)
+        users = self.wait()
+
+        expect(users).to_be_like([
+            {"first_name": "Bernardo", "index": 1},
+            {"first_name": "Someone", "index": 2},
+            {"first_name": "Tom", "index": 3},
+        ])
+
+        User.objects.values_list("index", "first_name").order_by(User.index)\
+            .find_all(callback=self.stop)
+        users = self.wait()
+
+        expect(users).to_be_like([(1, "Bernardo"), (2, "Someone"), (3, "Tom")])
+
+        User.objects.values_list("first_name", flat=True).order_by(User.index)\
+            .find_all(callback=self.stop)
+        names = self.wait()
+
+        expect(names).to_be_like(["Bernardo", "Someone", "Tom"])
+
+    def test_values_list_with_flat_requires_a_single_field(self):
+        with expect.error_to_happen(
+            ValueError, message="values_list with flat=True requires exactly one field."
+        ):
+            User.objects.values_list("index", "first_name", flat=True)
+
+    def test_can_get_raw_bson_documents(self):
+        User.objects.only("index").order_by(User.index).as_raw_bson().find_all(callback=self.stop)
+        users = self.wait()
+
+        expect(users).to_length(3)
+        expect(users[0]).to_be_instance_of(RawBSONDocument)
+        expect(users[0]["index"]).to_equal(1)
+        expect(users[0].raw).to_be_instance_of(bytes)
+
+        User.objects.only("index").as_raw_bson(to_json=True).get(index=2, callback=self.stop)
+        user = self.wait()
+
+        expect(json_util.loads(user)).to_be_like({"_id": self.user2._id, "index": 2})
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from preggy import expect
+from bson.objectid import ObjectId
+
+from motorengine import Document, Session, StringField
+from motorengine.session import get_current_session
+from tests import AsyncTestCase
+
+
+class Person(Document):
+    name = StringField()
+
+
+class Company(Document):
+    name = StringField()
+
+
+class TestSession(AsyncTestCase):
+    def test_session_keys_documents_by_class_and_id(self):
+        session = Session()
+        person = Person(name="Bernardo")
+        object_id = ObjectId()
+
+        session.add(person)
+        expect(session).to_length(0)
+
+        person._id = object_id
+        session.add(person)
+        session.add(Company(_id=object_id, name="Globo"))
+
+        expect(session).to_length(2)
+        expect(session.get(Person, object_id) is person).to_be_true()
+        expect(person in session).to_be_true()
+        expect(session.get(Person, None)).to_be_null()
+
+        session.discard_type(Company)
+        expect(session.get(Company, object_id)).to_be_null()
+
+        session.discard(person)
+        expect(session).to_length(0)
+
+    def test_session_keeps_the_documents_of_each_alias_apart(self):
+        session = Session()
+        object_id = ObjectId()
+        person = Person(_id=object_id, name="Bernardo")
+
+        session.add(person, alias="other")
+
+        expect(session.get(Person, object_id)).to_be_null()
+        expect(session.get(Person, object_id, alias="other") is person).to_be_true()
+
+        session.discard_type(Person)
+        expect(session).to_length(1)
+
+        session.discard_type(Person, alias="other")
+        expect(session).to_length(0)
+
+    def test_merge_updates_the_instance_in_the_session(self):
+        session = Session()
+        object_id = ObjectId()
+        person = Person(_id=object_id, name="Bernardo")
+        session.add(person)
+
+        merged = session.merge(Person(_id=object_id, name="Rafael"))
+
+        expect(merged is person).to_be_true()
+        expect(person.name).to_equal("Rafael")
+        expect(person.get_changed_fields()).to_be_empty()
+
+    def test_session_is_active_only_inside_its_context(self):
+        session = Session()
+        expect(get_current_session()).to_be_null()
+
+        with session:
+            expect(get_current_session() is session).to_be_true()
+
+            with Session() as inner:
+                expect(get_current_session() is inner).to_be_true()
+
+            expect(get_current_session() is session).to_be_true()
+
+        expect(get_current_session()).to_be_null()
+        expect(session.run(get_current_session) is session).to_be_true()
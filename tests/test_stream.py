@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+
+from preggy import expect
+from tornado.testing import gen_test
+
+from motorengine import (
+    Document, StringField, IntField, ReferenceField
+)
+from tests import AsyncTestCase
+
+
+class User(Document):
+    __collection__ = "UserStream"
+    name = StringField()
+    number = IntField()
+
+
+class Comment(Document):
+    __collection__ = "CommentStream"
+    __lazy__ = False
+    user = ReferenceField(User)
+
+
+class TestQueryStream(AsyncTestCase):
+    def setUp(self):
+        super(TestQueryStream, self).setUp()
+        self.drop_coll("UserStream")
+        self.drop_coll("CommentStream")
+
+    @gen_test
+    def test_can_stream_more_documents_than_find_all_returns(self):
+        yield User.objects.bulk_insert([
+            User(name=str(number), number=number)
+            for number in range(1050)
+        ])
+
+        stream = User.objects.order_by(User.number).stream(batch_size=100)
+
+        numbers = []
+        while (yield stream.fetch_next):
+            numbers.append(stream.next_object().number)
+
+        expect(numbers).to_be_like(list(range(1050)))
+        expect(stream.next_object()).to_be_null()
+
+    @gen_test
+    def test_can_stream_filtered_documents(self):
+        yield User.objects.bulk_insert([
+            User(name=str(number), number=number)
+            for number in range(20)
+        ])
+
+        stream = User.objects.filter(number__gte=15).stream(batch_size=2)
+
+        users = []
+        while (yield stream.fetch_next):
+            users.append(stream.next_object())
+
+        expect(users).to_length(5)
+        expect(users[0]).to_be_instance_of(User)
+
+    @gen_test
+    def test_stream_loads_references_of_not_lazy_documents(self):
+        user = yield User.objects.create(name="Bernardo", number=1)
+
+        yield Comment.objects.bulk_insert([Comment(user=user) for number in range(5)])
+
+        stream = Comment.objects.stream(batch_size=2)
+
+        while (yield stream.fetch_next):
+            comment = stream.next_object()
+            expect(comment.user).to_be_instance_of(User)
+            expect(comment.user.name).to_equal("Bernardo")
+
+    def test_cant_stream_with_invalid_batch_size(self):
+        try:
+            User.objects.stream(batch_size=0)
+        except ValueError:
+            err = sys.exc_info()[1]
+            expect(err).to_have_an_error_message_of(
+                "The batch_size argument must be a positive integer, not '0'."
+            )
+        else:
+            assert False, "Should not have gotten this far"